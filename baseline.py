@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: baseline.py
+# author: brendan
+# last modified: 10-18-2026 21:05
+#-------------------------------------------------------------------------------
+"""
+Calculate the shifting median baseline, and the IQR bounds around it, from the
+previous six months of ranks
+"""
+import bisect
+import collections
+import numpy as np
+import dateutil.relativedelta as rdelta
+
+Bounds = collections.namedtuple('Bounds', ['median', 'first_quart',
+                                           'third_quart', 'lower', 'upper'])
+
+
+def calc_prev_median(date, data, k=1.5):
+    """ Calculate the median for a certain date from the data of the previous
+    six months of data.
+    """
+    earliest_date = date - rdelta.relativedelta(months=6)
+    # keep only the data in this range
+    my_data = []
+    for check_date, rank in data:
+        if check_date >= earliest_date and check_date <= date:
+            my_data.append(rank)
+
+    median = np.median(my_data)
+    first_quart = np.percentile(my_data, 25)
+    third_quart = np.percentile(my_data, 75)
+    IQR = third_quart - first_quart
+
+    lower_bound = first_quart - k * IQR
+    # make sure the lower bound doesn't go below 1
+    lower_bound = lower_bound if lower_bound > 1 else 1
+    upper_bound = third_quart + k * IQR
+
+    return (date, median, lower_bound, upper_bound)
+
+
+def sorted_percentile(window, q):
+    """ Take the q-th percentile of a sorted list, interpolating linearly the
+    same way as np.percentile. Works on the first axis of a sorted array too
+    """
+    pos = q / 100 * (len(window) - 1)
+    lo = int(pos)
+    frac = pos - lo
+    if frac == 0:
+        return window[lo]
+    return window[lo] + frac * (window[lo + 1] - window[lo])
+
+
+def rolling_bounds(dates, ranks, k=1.5, months=6):
+    """ Calculate the median, quartiles and IQR bounds of the previous months
+    of ranks for every date in one pass. The dates need to be sorted. This
+    gives the same values as calling calc_prev_median on every date, but
+    slides a sorted window along the dates instead of rescanning all the data
+    """
+    n = len(dates)
+    median = np.empty(n)
+    first_quart = np.empty(n)
+    third_quart = np.empty(n)
+
+    # a plain sorted list, since the quartiles need the values at any position
+    # and not just the middle. Each insort is O(W), but W is only the ~180
+    # days of the window, so the memmove is a small part of every step
+    window = []
+    # the window covers dates[lo:hi]
+    lo = 0
+    hi = 0
+    for i, date in enumerate(dates):
+        earliest_date = date - rdelta.relativedelta(months=months)
+        while hi < n and dates[hi] <= date:
+            bisect.insort(window, ranks[hi])
+            hi += 1
+        while dates[lo] < earliest_date:
+            del window[bisect.bisect_left(window, ranks[lo])]
+            lo += 1
+
+        median[i] = sorted_percentile(window, 50)
+        first_quart[i] = sorted_percentile(window, 25)
+        third_quart[i] = sorted_percentile(window, 75)
+
+    IQR = third_quart - first_quart
+    lower = first_quart - k * IQR
+    # make sure the lower bound doesn't go below 1
+    lower[lower < 1] = 1
+    upper = third_quart + k * IQR
+
+    return Bounds(median, first_quart, third_quart, lower, upper)
+
+
+def window_starts(dates, months=6):
+    """ Find the index of the first date in the window of previous months for
+    every date. The dates need to be sorted
+    """
+    starts = np.empty(len(dates), dtype=np.int64)
+    lo = 0
+    for i, date in enumerate(dates):
+        earliest_date = date - rdelta.relativedelta(months=months)
+        while dates[lo] < earliest_date:
+            lo += 1
+        starts[i] = lo
+    return starts
+
+
+def window_ends(dates):
+    """ Find the index one past the last date in the window of every date, so
+    duplicate dates all land in the same window
+    """
+    ends = np.empty(len(dates), dtype=np.int64)
+    hi = 0
+    for i, date in enumerate(dates):
+        while hi < len(dates) and dates[hi] <= date:
+            hi += 1
+        ends[i] = hi
+    return ends
+
+
+def block_bounds(dates, ranks, k=1.5, months=6, start=0, chunk=4096):
+    """ Calculate the rolling bounds for every column of a days x words block
+    of ranks at once. Only the rows from start on get bounds, but the rows
+    before start are still used in their windows. The columns are worked
+    through chunk at a time to keep the memory down
+    """
+    starts = window_starts(dates, months)[start:]
+    ends = window_ends(dates)[start:]
+    n_rows = len(dates) - start
+    n_cols = ranks.shape[1]
+
+    quarts = np.empty((3, n_rows, n_cols))
+    for col in range(0, n_cols, chunk):
+        # lay the chunk out as words x days so each window sorts in place
+        block = np.ascontiguousarray(ranks[:, col:col + chunk].T,
+                                     dtype=np.float64)
+        for i in range(n_rows):
+            window = np.sort(block[:, starts[i]:ends[i]], axis=1)
+            for j, q in enumerate([25, 50, 75]):
+                quarts[j, i, col:col + chunk] = sorted_percentile(window.T, q)
+
+    first_quart, median, third_quart = quarts
+    IQR = third_quart - first_quart
+    lower = first_quart - k * IQR
+    # make sure the lower bound doesn't go below 1
+    lower[lower < 1] = 1
+    upper = third_quart + k * IQR
+
+    return Bounds(median, first_quart, third_quart, lower, upper)
+
+
+def year_bounds(full_data, year, k=1.5, months=6):
+    """ Calculate the rolling bounds for the dates in the year from the sorted
+    (date, rank) data. Returns the dates, ranks and bounds of just that year
+    """
+    dates, ranks = zip(*full_data)
+    bounds = rolling_bounds(dates, ranks, k, months)
+    in_year = np.array([date.year == year for date in dates])
+    year_dates = [date for date in dates if date.year == year]
+    bounds = Bounds(*[values[in_year] for values in bounds])
+    return year_dates, np.array(ranks)[in_year], bounds
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: batchshock.py
+# author: brendan
+# last modified: 10-18-2026 17:40
+#-------------------------------------------------------------------------------
+"""
+Calculate the shock scores for a whole word list across a pool of processes.
+Every worker reads the same memmapped rank store, so the ranks are only decoded
+once and the pages are shared between the workers
+"""
+import os
+import re
+import argparse
+import concurrent.futures as cf
+import rankstore
+import jobstats
+from shockdetector import calc_store_shocks
+
+# the rank store opened in each worker
+_STORE = None
+
+
+def read_words(filename):
+    """ Read the words out of a word list, one or more words per line split by
+    commas or spaces
+    """
+    words = []
+    with open(filename) as f:
+        for line in f:
+            words.extend(word for word in re.split(r'[,\s]+', line) if word)
+    return words
+
+
+def init_worker(store_dir, profile=False):
+    """ Open the rank store once per worker
+    """
+    global _STORE
+    _STORE = rankstore.load_store(store_dir)
+    if profile:
+        jobstats.enable()
+
+
+def score_words(words, year):
+    """ Score a chunk of words against the worker's rank store. Returns the
+    scores along with the stats the worker recorded for the chunk
+    """
+    scores = list(zip(words, calc_store_shocks(_STORE, words, year)))
+    return scores, jobstats.take()
+
+
+def run_batch(words, store_dir, outfile, year, workers=None, chunk=500):
+    """ Split the words into chunks across the process pool and write each
+    word,score line to the outfile as the chunks finish. The stats of the
+    workers are gathered up if they are turned on
+    """
+    chunks = [words[i:i + chunk] for i in range(0, len(words), chunk)]
+    records = []
+    with cf.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(store_dir, jobstats.enabled())) \
+            as pool, open(outfile, 'w') as sfile:
+        futures = [pool.submit(score_words, words, year) for words in chunks]
+        for i, future in enumerate(cf.as_completed(futures)):
+            scores, chunk_records = future.result()
+            for word, shock_val in scores:
+                sfile.write('{},{}\n'.format(word, shock_val))
+            sfile.flush()
+            records.extend(chunk_records)
+            print('{}/{} chunks done'.format(i + 1, len(chunks)))
+    return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Calculate the shock scores of a word list in parallel")
+    parser.add_argument('CWD', help='current working directory')
+    parser.add_argument('JOBID', help='job id for the VACC')
+    parser.add_argument('wordfile', nargs='?', default='test.txt',
+                        help='the file of words to shock detect')
+    parser.add_argument('year', nargs='?', default=2018, type=int,
+                        help='the year of concern')
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to read from, relative to CWD')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of processes, defaults to every core')
+    parser.add_argument('--chunk', type=int, default=500,
+                        help='the number of words handed to a worker at once')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the time and memory of each stage to a '
+                        'JOBID.stats.json sidecar')
+    args = parser.parse_args()
+
+    if args.profile:
+        jobstats.enable()
+
+    store_dir = os.path.join(args.CWD, args.store)
+    if not os.path.isdir(store_dir):
+        # decode the tarfile a single time for all of the workers
+        tarfile_name = '{}/top_daily_words_uni.tar_.gz'.format(args.CWD)
+        with jobstats.stage('build_store'):
+            rankstore.build_store(tarfile_name, store_dir,
+                                  {args.year, args.year - 1})
+
+    words = read_words(os.path.join(args.CWD, args.wordfile))
+    outfile = '{}/{}.txt'.format(args.CWD, args.JOBID)
+    records = run_batch(words, store_dir, outfile, args.year, args.workers,
+                        args.chunk)
+    if args.profile:
+        jobstats.write_sidecar(outfile, args.JOBID,
+                               jobstats.take() + records)
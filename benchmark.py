@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: benchmark.py
+# author: brendan
+# last modified: 10-18-2026 21:35
+#-------------------------------------------------------------------------------
+"""
+Benchmark each stage of the shock pipeline against a synthetic rank tarfile,
+so the timings can be compared to a saved baseline without the real data. The
+synthetic days rank a zipf shaped vocabulary with some noise every day, with
+shocks injected for chosen words on chosen days
+"""
+import matplotlib
+matplotlib.use('Agg')
+import os
+import io
+import json
+import hashlib
+import tarfile
+import timeit
+import platform
+import datetime as dt
+import numpy as np
+import argparse
+import rankarchive
+import extractstory
+from rankarchive import get_full_data
+from baseline import calc_prev_median, year_bounds
+from shockdetector import calc_max_shock
+from makewordplot import baseline_plot
+
+BASELINE_FILE = 'bench-baseline.json'
+DEFAULT_SHOCKS = ['shock0:420:10:5', 'shock1:500:20:50', 'shock2:600:5:1']
+
+
+def parse_shock(shock):
+    """ Parse a word:day:length:peak[:base] shock, where the word peaks at the
+    rank peak in the middle of the days from day on, and sits at the rank base
+    the rest of the time
+    """
+    fields = shock.split(':')
+    word = fields[0]
+    day, length, peak = [int(field) for field in fields[1:4]]
+    base = int(fields[4]) if len(fields) > 4 else None
+    return word, day, length, peak, base
+
+
+def make_archive(filename, days=670, vocab=5000, per_day=2000, shocks=(),
+                 start_date=dt.datetime(2017, 1, 1), seed=0):
+    """ Write a synthetic tarfile of daily rank files. Every day the words are
+    ranked by a zipf popularity with noise, and the top per_day are kept. The
+    shocks are word:day:length:peak[:base] strings
+    """
+    rng = np.random.default_rng(seed)
+    words = ['w{}'.format(i) for i in range(vocab)]
+    popularity = -np.log(np.arange(1, vocab + 1, dtype=np.float64))
+
+    shocks = [parse_shock(shock) for shock in shocks]
+    for word, _, _, _, base in shocks:
+        # the shock words sit well outside the daily ranks by default
+        words.append(word)
+        popularity = np.append(popularity, -np.log(base or 2 * per_day))
+    vocab = len(words)
+
+    with tarfile.open(filename, 'w:gz') as f:
+        for n in range(days):
+            date = start_date + dt.timedelta(n)
+            score = popularity + rng.normal(0, 0.3, vocab)
+            for i, (_, day, length, peak, _) in enumerate(shocks):
+                if day <= n < day + length:
+                    # rise to the peak in the middle of the shock and back
+                    middle = (length - 1) / 2
+                    rise = 1 - abs(n - day - middle) / (middle + 1)
+                    target = -np.log(peak)
+                    col = vocab - len(shocks) + i
+                    score[col] = max(score[col], popularity[col] + rise *
+                                     (target - popularity[col]))
+            top = np.argsort(-score, kind='stable')[:per_day]
+
+            lines = ['# Counts Rank']
+            for rank, col in enumerate(top.tolist()):
+                lines.append('{} {} {} {}'.format(rank, words[col],
+                                                  10 * (per_day - rank),
+                                                  rank + 1))
+            data = ('\n'.join(lines) + '\n').encode()
+            info = tarfile.TarInfo('top_daily_words_uni/{}.txt'.format(
+                date.strftime('%Y-%m-%d')))
+            info.size = len(data)
+            f.addfile(info, io.BytesIO(data))
+
+
+def config_name(config):
+    """ A short name for the synthetic archive of a config, so it is only
+    generated once
+    """
+    return hashlib.md5(json.dumps(config, sort_keys=True).encode())\
+        .hexdigest()[:10]
+
+
+def prepare(config, workdir):
+    """ Generate the synthetic tarfile of the config, along with a repacked
+    day archive of it in its own directory. Returns the paths of both
+    tarfiles
+    """
+    base_dir = os.path.join(workdir, config_name(config))
+    tar_name = os.path.join(base_dir, 'tar', 'top_daily_words_uni.tar_.gz')
+    days_name = os.path.join(base_dir, 'days', 'top_daily_words_uni.tar_.gz')
+    if not os.path.exists(days_name):
+        print('Generating the synthetic archive ...')
+        os.makedirs(os.path.dirname(tar_name), exist_ok=True)
+        os.makedirs(os.path.dirname(days_name), exist_ok=True)
+        make_archive(tar_name, config['days'], config['vocab'],
+                     config['per_day'], config['shocks'],
+                     seed=config['seed'])
+        rankarchive.repack(tar_name, rankarchive.day_archive_name(days_name))
+        os.symlink(os.path.abspath(tar_name), days_name)
+    return tar_name, days_name
+
+
+def time_stage(func, repeat):
+    """ Time a stage like timeit, taking the best of repeat runs, with enough
+    calls in each run for it to take a fifth of a second
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def run_benchmarks(config, workdir, repeat=3):
+    """ Time every stage of the pipeline on the synthetic archive of the
+    config. Returns the seconds each stage takes
+    """
+    tar_name, days_name = prepare(config, workdir)
+    year = config['year']
+    word = parse_shock(config['shocks'][0])[0]
+    words = [word, 'w0', 'w10', 'w100', 'w1000']
+    stages = {}
+
+    def timed(name, func):
+        stages[name] = time_stage(func, repeat)
+        print('{:<20} {:.6f}s'.format(name, stages[name]))
+
+    timed('tar_scan', lambda: get_full_data(words, tar_name, year))
+    timed('archive_scan', lambda: get_full_data(words, days_name, year))
+    full_data = get_full_data([word], tar_name, year)[word]
+    year_dates = [date for date, _ in full_data if date.year == year]
+    timed('calc_prev_median', lambda: [calc_prev_median(date, full_data)
+                                       for date in year_dates])
+    timed('year_bounds', lambda: year_bounds(full_data, year))
+
+    date, rank, bounds = year_bounds(full_data, year)
+    timed('calc_max_shock', lambda: calc_max_shock(rank, bounds.lower))
+
+    shock_ix = extractstory.calc_max_shock_ix(rank, bounds.lower)
+    shock_dates = date[shock_ix[0]:shock_ix[-1]]
+    extractstory.TARFILE = tar_name
+    timed('get_word_ranks', lambda: extractstory.get_word_ranks(
+        shock_dates[0], shock_dates[-1]))
+    window = extractstory.get_word_ranks(shock_dates[0], shock_dates[-1])
+    timed('test_rank', lambda: extractstory.test_rank(window, word, 10))
+
+    plot_file = os.path.join(workdir, 'plot.jpg')
+    timed('plot', lambda: baseline_plot(date, rank, bounds, word, year,
+                                        filename=plot_file))
+    return stages
+
+
+def compare(stages, baseline, tolerance):
+    """ Compare the stage timings to the baseline, printing the ratio of each
+    one. Returns the stages that got slower than the tolerance allows
+    """
+    regressions = []
+    print('{:<20} {:>12} {:>12} {:>8}'.format('stage', 'baseline', 'now',
+                                               'ratio'))
+    for name, seconds in stages.items():
+        if name not in baseline:
+            print('{:<20} {:>12} {:>12.6f}'.format(name, '-', seconds))
+            continue
+        ratio = seconds / baseline[name]
+        flag = ''
+        if ratio > tolerance:
+            regressions.append(name)
+            flag = ' REGRESSION'
+        print('{:<20} {:>12.6f} {:>12.6f} {:>8.2f}{}'.format(
+            name, baseline[name], seconds, ratio, flag))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Benchmark the shock pipeline on a synthetic archive")
+    parser.add_argument('--days', type=int, default=670,
+                        help='the number of days to generate')
+    parser.add_argument('--vocab', type=int, default=5000,
+                        help='the size of the vocabulary')
+    parser.add_argument('--per-day', type=int, default=2000,
+                        help='the number of words ranked each day')
+    parser.add_argument('--shock', action='append', dest='shocks',
+                        help='a word:day:length:peak[:base] shock to inject, '
+                        'can be given more than once')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the seed of the random ranks')
+    parser.add_argument('--year', type=int, default=2018,
+                        help='the year to benchmark')
+    parser.add_argument('--generate', metavar='TARFILE',
+                        help='only write the synthetic tarfile to TARFILE')
+    parser.add_argument('--workdir', default='bench',
+                        help='the directory for the synthetic archives')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='the number of runs to take the best of')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='the saved timings to compare against')
+    parser.add_argument('--save', action='store_true',
+                        help='save the timings as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='how many times slower than the baseline a '
+                        'stage can be')
+    args = parser.parse_args()
+
+    config = {'days': args.days, 'vocab': args.vocab,
+              'per_day': args.per_day, 'shocks': args.shocks or DEFAULT_SHOCKS,
+              'seed': args.seed, 'year': args.year}
+    if args.generate:
+        make_archive(args.generate, config['days'], config['vocab'],
+                     config['per_day'], config['shocks'], seed=config['seed'])
+    else:
+        baseline = None
+        if not args.save and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+            # timings of another archive say nothing about a regression, so
+            # don't spend the time running them
+            if baseline['config'] != config:
+                raise SystemExit('The baseline in {} was run with a different '
+                                 'config, run it again with --save'.format(
+                                     args.baseline))
+
+        stages = run_benchmarks(config, args.workdir, args.repeat)
+        if args.save:
+            with open(args.baseline, 'w') as f:
+                json.dump({'config': config,
+                           'python': platform.python_version(),
+                           'numpy': np.__version__, 'stages': stages}, f,
+                          indent=2, sort_keys=True)
+                f.write('\n')
+            print('Saved the baseline to {}'.format(args.baseline))
+        elif baseline is not None:
+            regressions = compare(stages, baseline['stages'], args.tolerance)
+            if regressions:
+                raise SystemExit('Slower than the baseline: {}'.format(
+                    ', '.join(regressions)))
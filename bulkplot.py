@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: bulkplot.py
+# author: brendan
+# last modified: 10-19-2026 10:35
+#-------------------------------------------------------------------------------
+"""
+Render the baseline and shock event comparison plots for a whole word list
+across a pool of processes. The bounds of each chunk of words are taken from
+the saved shockstate of the year, or worked out in one go out of the rank
+store, and a manifest of the hash of every word's inputs lets the plots that
+haven't changed be skipped on the next run
+"""
+import matplotlib
+matplotlib.use('Agg')
+import os
+import json
+import hashlib
+import argparse
+import concurrent.futures as cf
+import numpy as np
+import rankstore
+import shockstate
+from baseline import Bounds, block_bounds, window_starts
+from batchshock import read_words
+from shockstate import year_rows
+from makewordplot import baseline_plot
+from extractstory import calc_max_shock_ix, comparison_date_plot, test_rank
+
+MANIFEST_FILE = 'manifest.json'
+
+# the rank store opened in each worker
+_STORE = None
+_STORE_DIR = None
+
+
+def init_worker(store_dir):
+    """ Open the rank store once per worker
+    """
+    global _STORE, _STORE_DIR
+    _STORE = rankstore.load_store(store_dir)
+    _STORE_DIR = store_dir
+
+
+def saved_bounds(store_dir, year, n_rows, k=1.5, months=6):
+    """ Get the bounds saved by shockstate for the year, as long as they were
+    worked out the same way and cover every day of the year in the store.
+    Returns the columns of the state's words and its (median, lower, upper)
+    bounds, or None
+    """
+    state_dir = os.path.join(store_dir, shockstate.STATE_DIR.format(year))
+    try:
+        with open(os.path.join(state_dir, shockstate.STATE_FILE)) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    bounds = shockstate.load_bounds(state_dir, mmap_mode='r')
+    if bounds is None or state['k'] != k or state['months'] != months or \
+            bounds[1].shape[0] != n_rows:
+        return None
+    with open(os.path.join(state_dir, shockstate.WORDS_FILE)) as f:
+        words = f.read().split('\n')[:-1]
+    return {word: i for i, word in enumerate(words)}, bounds
+
+
+def plot_files(word, year, log, compare):
+    """ The names of the plots made for the word
+    """
+    files = ['{}-{}-baseline-comparison{}.jpg'.format(word, year,
+                                                      '-LOG' if log else '')]
+    if compare:
+        files.append('{}-{}-shock-event-comparison.jpg'.format(word, year))
+    return files
+
+
+def input_hash(ranks, *params):
+    """ Hash the ranks a plot is made from along with its parameters
+    """
+    md5 = hashlib.md5(np.ascontiguousarray(ranks).tobytes())
+    md5.update(repr(params).encode('utf8'))
+    return md5.hexdigest()
+
+
+def render_words(words, year, outdir, manifest, log=False, compare=True, n=10):
+    """ Render the plots of a chunk of words out of the worker's rank store,
+    skipping the words whose inputs match the manifest. Returns the word,
+    hash and files of every word that was rendered
+    """
+    store = _STORE
+    start, end = year_rows(store, year)
+    window_row = window_starts(store.dates[:end])[start]
+    block = rankstore.word_block(store, words, start=window_row)
+    block = block[:end - window_row]
+    year_dates = store.dates[start:end]
+
+    todo = []
+    for i, word in enumerate(words):
+        # the comparison plots also depend on the rest of the vocabulary and
+        # the days of the store
+        word_hash = input_hash(block[:, i], year, log, compare, n,
+                               len(store.words), len(store.dates),
+                               store.dates[-1].strftime('%Y-%m-%d'))
+        entry = manifest.get(word)
+        if (entry is None or entry['hash'] != word_hash or
+                not all(os.path.exists(os.path.join(outdir, filename))
+                        for filename in entry['files'])):
+            todo.append((i, word, word_hash))
+    if not todo:
+        return []
+
+    # reuse the bounds shockstate saved for the year, and only work out the
+    # bounds of the rest of the words that are plotted again
+    all_bounds = {}
+    saved = saved_bounds(_STORE_DIR, year, end - start)
+    if saved is not None:
+        state_cols, (median, lower, upper) = saved
+        for _, word, _ in todo:
+            if word in state_cols:
+                col = state_cols[word]
+                # the state doesn't keep the quartiles, which aren't plotted
+                all_bounds[word] = Bounds(np.array(median[:, col]), None, None,
+                                          np.array(lower[:, col]),
+                                          np.array(upper[:, col]))
+    missing = [(i, word) for i, word, _ in todo if word not in all_bounds]
+    if missing:
+        bounds = block_bounds(store.dates[window_row:end],
+                              block[:, [i for i, _ in missing]],
+                              start=start - window_row)
+        for j, (_, word) in enumerate(missing):
+            all_bounds[word] = Bounds(*[values[:, j] for values in bounds])
+
+    rendered = []
+    for i, word, word_hash in todo:
+        rank = block[start - window_row:, i]
+        word_bounds = all_bounds[word]
+        files = plot_files(word, year, log, compare)
+        baseline_plot(year_dates, rank, word_bounds, word, year, log,
+                      os.path.join(outdir, files[0]))
+
+        shock_ix = calc_max_shock_ix(rank, word_bounds.lower)
+        if compare and not np.isscalar(shock_ix) and len(shock_ix) > 1:
+            shock_dates = year_dates[shock_ix[0]:shock_ix[-1]]
+            window = rankstore.date_window(store, shock_dates[0],
+                                           shock_dates[-1])
+            _, compare_words = zip(*test_rank(window, word, n))
+            comparison_date_plot(compare_words, window, shock_dates[0],
+                                 shock_dates[-1], word, year,
+                                 os.path.join(outdir, files[1]))
+        else:
+            # words without a shock only get the baseline plot
+            files = files[:1]
+        rendered.append((word, word_hash, files))
+    return rendered
+
+
+def load_manifest(outdir):
+    """ Load the manifest of the plots already rendered in outdir
+    """
+    try:
+        with open(os.path.join(outdir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(outdir, manifest):
+    """ Save the manifest, swapping it in so a killed run doesn't leave a
+    broken one behind
+    """
+    manifest_file = os.path.join(outdir, MANIFEST_FILE)
+    with open('{}.tmp'.format(manifest_file), 'w') as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace('{}.tmp'.format(manifest_file), manifest_file)
+
+
+def run_plots(words, store_dir, outdir, year, log=False, compare=True,
+              workers=None, chunk=100, force=False):
+    """ Split the words into chunks across the process pool and render their
+    plots into outdir, updating the manifest as the chunks finish
+    """
+    os.makedirs(outdir, exist_ok=True)
+    manifest = {} if force else load_manifest(outdir)
+    chunks = [words[i:i + chunk] for i in range(0, len(words), chunk)]
+    n_rendered = 0
+    with cf.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                initargs=(store_dir,)) as pool:
+        futures = [pool.submit(render_words, words, year, outdir,
+                               {word: manifest[word] for word in words
+                                if word in manifest}, log, compare)
+                   for words in chunks]
+        for i, future in enumerate(cf.as_completed(futures)):
+            for word, word_hash, files in future.result():
+                manifest[word] = {'hash': word_hash, 'files': files}
+                n_rendered += 1
+            save_manifest(outdir, manifest)
+            print('{}/{} chunks done'.format(i + 1, len(chunks)))
+    return n_rendered
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Render the plots of a word list in parallel")
+    parser.add_argument('wordfile', help='the file of words to plot')
+    parser.add_argument('year', nargs='?', default=2018, type=int,
+                        help='the year of concern for the plots')
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to read the ranks from')
+    parser.add_argument('--out', default='docs/plots',
+                        help='the directory to render the plots to')
+    parser.add_argument('--log', action='store_true',
+                        help='make log plots of the baselines')
+    parser.add_argument('--no-compare', action='store_true',
+                        help="don't make the shock event comparison plots")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of processes, defaults to every core')
+    parser.add_argument('--chunk', type=int, default=100,
+                        help='the number of words handed to a worker at once')
+    parser.add_argument('--force', action='store_true',
+                        help='render every plot, even the unchanged ones')
+    args = parser.parse_args()
+
+    n_rendered = run_plots(read_words(args.wordfile), args.store, args.out,
+                           args.year, args.log, not args.no_compare,
+                           args.workers, args.chunk, args.force)
+    print('Rendered the plots of {} words'.format(n_rendered))
@@ -4,232 +4,99 @@
 # created on: 12-09-2018
 # filename: extractstory.py
 # author: brendan
-# last modified: 12-09-2018 19:28
+# last modified: 10-19-2026 10:45
 #-------------------------------------------------------------------------------
 """
-Code to extract the story surrounding large shock events
+Code to extract the story surrounding large shock events. Many events can be
+run at once, with the windows of all of them read in a single archive pass
 """
-import tarfile
 import numpy as np
 import datetime as dt
-import dateutil.relativedelta as rdelta
 import matplotlib.pyplot as plt
 import matplotlib.dates as dts
-import pickle
 import argparse
+import os
+import csv
+import rankstore
+import rankarchive
+import seriescache
+import wordmemo
+from baseline import year_bounds
+from shockevents import find_events
+from similarity import bw_scores, best_lags, top_n
 
-def calc_prev_median(date, data, k=1.5):
-    """ Calculate the median for a certain date from the data of the previous
-    six months of data.
-    """
-    earliest_date = date - rdelta.relativedelta(months=6)
-    # keep only the data in this range
-    my_data = []
-    for check_date, rank in data:
-        if check_date >= earliest_date and check_date <= date:
-            my_data.append(rank)
-    
-    median = np.median(my_data)
-    first_quart = np.percentile(my_data, 25)
-    third_quart = np.percentile(my_data, 75)
-    IQR = third_quart - first_quart
-
-    lower_bound = first_quart - k * IQR
-    # make sure the lower bound doesn't go below 1
-    lower_bound = lower_bound if lower_bound > 1 else 1
-    upper_bound = third_quart + k * IQR
-
-    return (date, median, lower_bound, upper_bound)
+TARFILE = 'top_daily_words_uni.tar_.gz'
+STORE = 'rank_store'
 
 
 def calc_max_shock_ix(rank, l_bound):
     """ Calculate the max shock score given the rank of the word and the lower
-    bound on those scores
+    bound on those scores, and return the indexes of that event
     """
-    rank_arr = np.array(rank)
-    lbound_arr = np.array(l_bound)
-    z = rank_arr - lbound_arr
-    shock_ix = (z < 0).nonzero()[0]
+    events = find_events(rank, l_bound)
     # if there is no shock return 0
-    if shock_ix.size == 0:
+    if events.area.size == 0:
         return 0
-    # we know that the lines will cross again before the min shock_ix and max
-    # shock_ix, so we need to account for that
-    # add the index before and after the shock event
-    new_ixs = []
-    events = []
-    event = 0
-    for ix in shock_ix:
-        # if the previous index is not there start a new event
-        if (shock_ix != ix - 1).all():
-            new_ixs.append(ix - 1)
-            events.append(event)
-        new_ixs.append(ix)
-        events.append(event)
-        if (shock_ix != ix + 1).all():
-            new_ixs.append(ix + 1)
-            events.append(event)
-            event += 1
-
-    # create an empty array to keep track of event sizes, where index is event
-    # number and the value is the event size
-    event_sizes = np.empty(max(events)+1)
-    shock_ix = np.array(new_ixs)
-    events = np.array(events)
-    max_event = 0
-    # loop through unique events to calculate trapezoidal area
-    for event in range(min(events), max(events) + 1):
-        # first shrink z to the event
-        this_event = (events == event)
-        # boil down indices to just event
-        event_ix = np.where(this_event, shock_ix, 0)
-        # remove zeros, from event index
-        event_ix = event_ix[event_ix != 0]
-        event_z = z[event_ix]
-        
-        # find the area of the first and last triangles of the event
-        first_intersect = - 1 / (event_z[1] - event_z[0]) * event_z[0]
-        last_intersect = - 1 / (event_z[-1] - event_z[-2]) * event_z[-2]
-        
-        area = 0.5 * (1 - first_intersect) * abs(event_z[1])
-        area += 0.5 * last_intersect * abs(event_z[-2])
-        
-        # find the area of the middle if it exists
-        if len(event_ix) > 3:
-            middle = event_z[1:-1]
-            middle_areas = abs(middle[:-1] + middle[1:]) * 0.5
-            area += middle_areas.sum()
-
-        event_sizes[event] = area
-        
-        # keep track of the indexes of the largest event
-        if area > max_event:
-            max_event = area
-            max_ix = event_ix
-    
-    return max_ix
- 
+    largest = np.argmax(events.area)
+    # include the days on either side of the event, where the lines cross
+    first_ix = max(events.start[largest] - 1, 0)
+    last_ix = min(events.end[largest] + 1, len(rank) - 1)
+    return np.arange(first_ix, last_ix + 1)
+
 
-def get_word_ranks(start_date, end_date):
-    """ Get a dictionary of the word to word ranks for the date range
+def get_word_ranks(start_date, end_date, cutoff=100001):
+    """ Get the dense words x days window of ranks for the date range
     specified. This will be used to determine which words are most similar to
     the word that has shock value
     """
-    word_dict = {}
-
-    with tarfile.open(TARFILE, mode='r:gz') as f:
-            for member in f:
-                if member.isfile():
-                    # parse the date from the file name
-                    date_str = member.name.split('.')[0][-10:]
-                    try:
-                        date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        print(member.name.split('.'))
-                    if date >= start_date and date <= end_date:
-                        print('{} ...'.format(date))
-                        # flag to record if the word was found in the file
-                        for i, line in enumerate(f.extractfile(member)):
-                            info = line.decode().split()
-                            try:
-                                word_dict[info[1]].append((date,
-                                                           int(info[-1])))
-                            except KeyError:
-                                try:
-                                    word_dict[info[1]] = [(date,
-                                                           int(info[-1]))]
-                                except ValueError:
-                                    continue
-
-    return word_dict
-
-
-def remove_duplicates(rank_list):
-    """ Remove values from duplicate days, using the smaller rank value from
-    duplicates
-    """
-    dates_seen = []
-    ranks_seen = []
-    for date, rank in rank_list:
-        if date in dates_seen:
-            ix = dates_seen.index(date)
-            if rank < ranks_seen[ix]:
-                ranks_seen[ix] = rank
-        else:
-            dates_seen.append(date)
-            ranks_seen.append(rank)
-    return list(zip(dates_seen, ranks_seen))
+    dates = [start_date + dt.timedelta(n)
+             for n in range((end_date - start_date).days + 1)]
+    # only the days in the range are read if the tarfile has been repacked
+    return rankarchive.get_rank_window(TARFILE, dates, cutoff)
 
 
-def fill_missing_dates(rank_list, shock_dates, cutoff=100001):
-    """ Fill missing dates if the list of ranks is missing them, and set them
-    as the lowest possible value.
-    """
-    for key, values in rank_list.items():
-        if len(values) < len(shock_dates):
-            dates, ranks = zip(*values)
-            for date in shock_dates:
-                if date not in dates:
-                    values.append((date, cutoff))
-        values = sorted(values)
-        if len(values) > len(shock_dates):
-            values = remove_duplicates(values)
-        
-        rank_list[key] = values
-    
-    return rank_list
-
-
-def brendan_whitney_test(dist1, dist2, cumulative=True):
-    """ My own test to determine the words that are most similar
-    """
-    if len(dist1) != len(dist2):
-        raise ValueError('Distributions do not have the same length')
-    
-    if cumulative:
-        cum_dist = 0
-        for i in range(len(dist1)):
-            cum_dist += (dist1[i] - dist2[i]) ** 2
-
-        return cum_dist
-    
-    max_dist = 0
-    for i in range(len(dist1)):
-        dist = (dist1[i] - dist2[i]) ** 2
-        if dist > max_dist:
-            max_dist = dist
-        # exponentially decay the weights of the distance between points
-        # cum_dist += np.exp(-i) * (dist1[i] - dist2[i]) ** 2
-    
-    return max_dist
-
-
-def test_rank(rank_list, word, n):
+def test_rank(window, word, n):
     """ Check each word for similarity to the distribution of the word we
     desire. Return the top n words.
     """
-    _, base_check = zip(*sorted(rank_list[word]))
-    # just subtract the mean of the dataset, to make the mean 0
-    std_base_check = [data - np.mean(base_check) for data in base_check]
-    
-    words = []
-    for key, values in rank_list.items():
-        if key == word:
-            continue
-
-        _, test_check = zip(*sorted(values))
-        # move the data to a mean of 0
-        std_test_check = [data - np.mean(test_check) for data in test_check]
-        score = brendan_whitney_test(std_base_check, std_test_check)
-        
-        words.append((score, key))
-        
-    words = sorted(words)
-    return words[:n]
-
-
-def comparison_date_plot(compare_words, full_word_data, start_date, end_date):
-    """Plot the comparison words with a legend for readability
+    base_row = window.vocab[word]
+    base_check = window.ranks[base_row]
+    # score every other word in the window at once
+    keys = window.words[:base_row] + window.words[base_row + 1:]
+    test_block = np.delete(window.ranks, base_row, axis=0)
+    scores = bw_scores(base_check, test_block)
+
+    return top_n(scores, keys, n)
+
+
+def test_lag(window, word, n, max_lag, start_date, end_date):
+    """ Find the n words whose ranks are the most correlated with the word's
+    from start_date to end_date when moved up to max_lag days either way. The
+    lags count the days of the window, since the days missing from the archive
+    aren't in it, and are cut down to the days the window has on both sides of
+    the event, like at the end of the data. Returns (correlation, lag, word)
+    with the words that lead the shock at a negative lag
+    """
+    base_row = window.vocab[word]
+    in_event = [i for i, date in enumerate(window.dates)
+                if date >= start_date and date <= end_date]
+    first = in_event[0]
+    last = in_event[-1] + 1
+    max_lag = min(max_lag, first, len(window.dates) - last)
+    base_check = window.ranks[base_row, first:last]
+    keys = window.words[:base_row] + window.words[base_row + 1:]
+    test_block = np.delete(window.ranks[:, first - max_lag:last + max_lag],
+                           base_row, axis=0)
+    lags, corrs = best_lags(base_check, test_block, max_lag)
+
+    top = top_n(-corrs, range(len(keys)), n)
+    return [(-corr, lags[i], keys[i]) for corr, i in top]
+
+
+def comparison_date_plot(compare_words, window, start_date, end_date, word,
+                         year, filename=None):
+    """Plot the comparison words with a legend for readability, saving it to
+    filename, which defaults to the plots directory
     """
     fig, ax = plt.subplots()
     loc = dts.MonthLocator()
@@ -238,85 +105,183 @@ def comparison_date_plot(compare_words, full_word_data, start_date, end_date):
     else:
         myFmt = dts.DateFormatter('%m')
     
-    for word in compare_words:
-        event_list = sorted(full_word_data[word])
-        this_event = [(date, data) for date, data in event_list if
-                       date >= start_date and date <= end_date]
-
-        date, rank = zip(*this_event)
-        ax.plot(date, rank, label=word)
-    
-    base_event = sorted(full_word_data[WORD])
-    this_event = [(date, data) for date, data in base_event if
-                   date >= start_date and date <= end_date]
-
-    date, rank = zip(*this_event)
-    ax.plot(date, rank, 'k-', label=WORD)
+    # only plot the dates of the window in the range
+    in_range = [i for i, date in enumerate(window.dates)
+                if date >= start_date and date <= end_date]
+    date = [window.dates[i] for i in in_range]
+    for compare_word in compare_words:
+        ax.plot(date, window.ranks[window.vocab[compare_word], in_range],
+                label=compare_word)
+
+    ax.plot(date, window.ranks[window.vocab[word], in_range], 'k-',
+            label=word)
     ax.set_xlabel('Month')
     ax.set_ylabel('Rank')
     ax.invert_yaxis()
     ax.xaxis.set_major_formatter(myFmt)
     ax.legend()
-    ax.set_title('Rank plot for {} in {}'.format(WORD, YEAR))
-    fig.savefig('plots/{}-{}-shock-event-comparison.jpg'.format(WORD, YEAR))
+    ax.set_title('Rank plot for {} in {}'.format(word, year))
+    if filename is None:
+        filename = 'plots/{}-{}-shock-event-comparison.jpg'.format(word, year)
+    fig.savefig(filename)
     plt.close(fig)
 
 
+def shock_event_dates(full_data, year):
+    """ Get the first and last date of the largest shock event of the word in
+    the year, or None if it never shocks
+    """
+    date, rank, bounds = year_bounds(full_data, year)
+    shock_ix = calc_max_shock_ix(rank, bounds.lower)
+    if np.isscalar(shock_ix) or len(shock_ix) < 2:
+        return None
+
+    shock_dates = date[shock_ix[0]:shock_ix[-1]]
+    return shock_dates[0], shock_dates[-1]
+
+
+def merge_intervals(intervals):
+    """ Merge the overlapping and touching (start_date, end_date) intervals,
+    returning them sorted
+    """
+    merged = []
+    for start_date, end_date in sorted(intervals):
+        if merged and start_date <= merged[-1][1] + dt.timedelta(1):
+            merged[-1][1] = max(merged[-1][1], end_date)
+        else:
+            merged.append([start_date, end_date])
+    return [tuple(interval) for interval in merged]
+
+
+def get_event_windows(events, cutoff=100001):
+    """ Get the window of ranks of each (word, start_date, end_date) event.
+    The overlapping date ranges are merged and the windows of all of them are
+    built out of a single pass through the archive
+    """
+    intervals = merge_intervals((start_date, end_date)
+                                for _, start_date, end_date in events)
+    date_lists = [[start_date + dt.timedelta(n)
+                   for n in range((end_date - start_date).days + 1)]
+                  for start_date, end_date in intervals]
+    days = rankarchive.iter_interval_days(TARFILE, intervals)
+    merged = rankarchive.build_windows(days, date_lists, cutoff)
+
+    starts = [start_date for start_date, _ in intervals]
+    windows = []
+    for _, start_date, end_date in events:
+        window = merged[np.searchsorted(starts, start_date, side='right') - 1]
+        windows.append(rankarchive.slice_window(window, start_date, end_date,
+                                                cutoff))
+    return windows
+
+
+def read_events(filename):
+    """ Read the word,start_date,end_date events out of a file, with the dates
+    as YYYY-MM-DD
+    """
+    events = []
+    with open(filename) as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            word, start_date, end_date = row[:3]
+            events.append((word, dt.datetime.strptime(start_date, '%Y-%m-%d'),
+                           dt.datetime.strptime(end_date, '%Y-%m-%d')))
+    return events
+
+
+def read_top_words(filename, n):
+    """ Read the n words with the largest shocks out of a word,score file,
+    skipping the words that couldn't be scored
+    """
+    scores = []
+    with open(filename) as f:
+        for row in csv.reader(f):
+            if len(row) == 2:
+                score = float(row[1])
+                # nan scores don't sort, so they would shuffle the top words
+                if np.isfinite(score):
+                    scores.append((-score, row[0]))
+    return [word for _, word in sorted(scores)[:n]]
+
+
+def find_word_events(words, year, cutoff=100001):
+    """ Find the largest shock event of each of the words in the year
+    """
+    if os.path.isdir(STORE):
+        store = rankstore.load_store(STORE)
+        word_data = {word: rankstore.word_series(store, word, year)
+                     for word in words}
+    else:
+        # the words missing from the cache are read in one pass
+        word_data = seriescache.load_many(words, year, TARFILE, cutoff)
+    events = []
+    for word in words:
+        full_data = word_data[word]
+        shock = shock_event_dates(full_data, year)
+        if shock is None:
+            print('{} has no shock in {}'.format(word, year))
+            continue
+        events.append((word,) + shock)
+    return events
+
+
+def extract_stories(events, year, outfile, n=10, cutoff=100001, plot=True,
+                    max_lag=0, lagfile=None):
+    """ Find the n words most similar to the word of each event, writing a
+    word,start_date,end_date,similar words line for each event to the outfile.
+    With a max_lag, the n words most correlated with the word up to max_lag
+    days before or after are written to the lagfile as word:lag:correlation
+    """
+    pad = dt.timedelta(max_lag)
+    windows = get_event_windows([(word, start_date - pad, end_date + pad)
+                                 for word, start_date, end_date in events],
+                                cutoff)
+    # without a max_lag the lags aren't worked out and nothing is written
+    with open(outfile, 'w') as sfile, \
+            open(lagfile if max_lag else os.devnull, 'w') as lfile:
+        for (word, start_date, end_date), lag_window in zip(events, windows):
+            window = rankarchive.slice_window(lag_window, start_date,
+                                              end_date, cutoff)
+            if word not in window.vocab:
+                print('{} is not ranked from {:%Y-%m-%d} to {:%Y-%m-%d}'
+                      .format(word, start_date, end_date))
+                continue
+            _, compare_words = zip(*test_rank(window, word, n))
+            sfile.write('{},{:%Y-%m-%d},{:%Y-%m-%d},{}\n'.format(
+                word, start_date, end_date, ' '.join(compare_words)))
+            if max_lag:
+                lag_words = ['{}:{}:{:.4f}'.format(lag_word, lag, corr)
+                             for corr, lag, lag_word in
+                             test_lag(lag_window, word, n, max_lag,
+                                      start_date, end_date)]
+                lfile.write('{},{:%Y-%m-%d},{:%Y-%m-%d},{}\n'.format(
+                    word, start_date, end_date, ' '.join(lag_words)))
+            if plot:
+                comparison_date_plot(compare_words, window, start_date,
+                                     end_date, word, year)
+            print('{} ...'.format(word))
+
+
 def main(CUTOFF=100001):
     """ Run the program with the 3 global varables taken from the arg parsing
     """
-    try:
-        with open('data/{}-{}-full-data.pkl'.format(WORD, YEAR), 'rb') as f:
-            full_data = pickle.load(f, encoding='bytes')
-    except:
-        full_data = []
-        with tarfile.open(TARFILE, mode='r:gz') as f:
-            for member in f:
-                if member.isfile():
-                    # parse the date from the file name
-                    date_str = member.name.split('.')[0][-10:]
-                    try:
-                        date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        print(member.name.split('.'))
-                    if date.year == YEAR or date.year == YEAR - 1:
-                        # flag to record if the word was found in the file
-                        found = False
-                        for line in f.extractfile(member):
-                            if WORD in line.decode():
-                                rank = int(line.decode().split()[-1])
-                                full_data.append((date, rank))
-                                found = True
-                                break
-                        # if the word isn't found give it the max rank
-                        if not found:
-                            rank = CUTOFF
-                            full_data.append((date, rank))
-
-        full_data = sorted(full_data)
-        with open('data/{}-{}-full-data.pkl'.format(WORD, YEAR), 'wb') as f:
-            pickle.dump(full_data, f)
-
-    median_data = []
-    for date, _ in full_data:
-        if date.year == YEAR:
-            median_data.append(calc_prev_median(date, full_data))
-
-    year_data = [(date, data) for date, data in full_data if date.year == YEAR]
-
-    date, rank = zip(*year_data)
-    _, _, u_bound, _ = zip(*median_data)
-
-    shock_ix = calc_max_shock_ix(rank, u_bound)
+    # the ranks, bounds and windows are kept in memory between calls
+    date, rank, bounds = wordmemo.word_bounds(WORD, YEAR, TARFILE, CUTOFF,
+                                              STORE)
+
+    shock_ix = calc_max_shock_ix(rank, bounds.lower)
     
     shock_dates = date[shock_ix[0]:shock_ix[-1]]
-    word_dict = get_word_ranks(shock_dates[0], shock_dates[-1])
-    word_dict = fill_missing_dates(word_dict, shock_dates)
+    window = wordmemo.memo(('window', TARFILE, shock_dates[0],
+                            shock_dates[-1], CUTOFF),
+                           lambda: get_word_ranks(shock_dates[0],
+                                                  shock_dates[-1], CUTOFF))
 
-    _, compare_words = zip(*test_rank(word_dict, WORD, 10))
+    _, compare_words = zip(*test_rank(window, WORD, 10))
 
-    comparison_date_plot(compare_words, word_dict, shock_dates[0],
-                         shock_dates[-1])
+    comparison_date_plot(compare_words, window, shock_dates[0],
+                         shock_dates[-1], WORD, YEAR)
 
 
 if __name__ == '__main__':
@@ -326,17 +291,49 @@ if __name__ == '__main__':
     """
     parser = argparse.ArgumentParser(
         description="Make a word plot with shifting median for a given year")
-    parser.add_argument('word',
+    parser.add_argument('word', nargs='?',
                         help='the words to shock detect')
-    parser.add_argument('year', nargs='?', default=2018,
+    parser.add_argument('year', nargs='?', default=2018, type=int,
                         help='the year of concern for the plot')
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to read the ranks from')
+    parser.add_argument('--events',
+                        help='a file of word,start,end events to extract')
+    parser.add_argument('--scores',
+                        help='a file of word,score lines to take the top '
+                        'shocks from')
+    parser.add_argument('--top', type=int, default=100,
+                        help='the number of top shocks to take from --scores')
+    parser.add_argument('--out', default='stories.txt',
+                        help='the file to write the batch stories to')
+    parser.add_argument('--lag', type=int, default=0,
+                        help='also find the words leading or following each '
+                        'event by up to this many days')
+    parser.add_argument('--lag-out', default='lags.txt',
+                        help='the file to write the leading and following '
+                        'words to')
+    parser.add_argument('--no-plots', action='store_true',
+                        help="don't plot every event of the batch")
     args = parser.parse_args()
     
     # global variables defined
     TARFILE = 'top_daily_words_uni.tar_.gz'
     WORD = args.word
     YEAR = args.year
+    STORE = args.store
     # max rank of table
     CUTOFF = 100001
 
-    main() 
+    if args.events or args.scores:
+        if args.events:
+            events = read_events(args.events)
+        else:
+            events = find_word_events(read_top_words(args.scores, args.top),
+                                      YEAR, CUTOFF)
+        extract_stories(events, YEAR, args.out, cutoff=CUTOFF,
+                        plot=not args.no_plots, max_lag=args.lag,
+                        lagfile=args.lag_out)
+    elif WORD is None:
+        parser.error('a word, --events or --scores is needed')
+    else:
+        main()
@@ -4,20 +4,19 @@
 # created on: 11-28-2018
 # filename: findshock.py
 # author: brendan
-# last modified: 12-09-2018 19:26
+# last modified: 10-19-2026 10:45
 #-------------------------------------------------------------------------------
 """
 Code to detect schock value from the data taken to make word plots
 """
-import tarfile
 import numpy as np
 import datetime as dt
-import dateutil.relativedelta as rdelta
 import matplotlib.pyplot as plt
 import matplotlib.dates as dts
-import pickle
-from makewordplot import calc_prev_median
-from scipy.stats import ks_2samp
+from baseline import year_bounds
+import rankarchive
+import seriescache
+from similarity import bw_scores, ks_scores, top_n
 
 WORD = 'cave'
 YEAR = 2018
@@ -62,8 +61,7 @@ def main_date_plot(full_date, start_date, end_date):
     plt.close(fig)
 
 
-def comparison_date_plot(compare_words, full_word_data, start_date, end_date,
-                        test):
+def comparison_date_plot(compare_words, window, start_date, end_date, test):
     """Plot the comparison words with a legend for readability
     """
     fig, ax = plt.subplots()
@@ -73,20 +71,15 @@ def comparison_date_plot(compare_words, full_word_data, start_date, end_date,
     else:
         myFmt = dts.DateFormatter('%m')
     
+    # only plot the dates of the window in the range
+    in_range = [i for i, date in enumerate(window.dates)
+                if date >= start_date and date <= end_date]
+    date = [window.dates[i] for i in in_range]
     for word in compare_words:
-        event_list = sorted(full_word_data[word])
-        this_event = [(date, data) for date, data in event_list if
-                       date >= prev_date and date <= final_date]
+        ax.plot(date, window.ranks[window.vocab[word], in_range], label=word)
 
-        date, rank = zip(*this_event)
-        ax.plot(date, rank, label=word)
-    
-    base_event = sorted(full_word_data[WORD])
-    this_event = [(date, data) for date, data in base_event if
-                   date >= prev_date and date <= final_date]
-
-    date, rank = zip(*this_event)
-    ax.plot(date, rank, 'k-', label=WORD)
+    ax.plot(date, window.ranks[window.vocab[WORD], in_range], 'k-',
+            label=WORD)
     ax.set_xlabel('Month')
     ax.set_ylabel('Rank')
     ax.invert_yaxis()
@@ -98,146 +91,46 @@ def comparison_date_plot(compare_words, full_word_data, start_date, end_date,
     plt.close(fig)
 
 
-def get_word_ranks(start_date, end_date):
-    """ Get a dictionary of the word to word ranks for the date range
+def get_word_ranks(start_date, end_date, cutoff=100001):
+    """ Get the dense words x days window of ranks for the date range
     specified. This will be used to determine which words are most similar to
     the word that has shock value
     """
-    word_dict = {}
-
-    with tarfile.open(TARFILE, mode='r:gz') as f:
-            for member in f:
-                if member.isfile():
-                    # parse the date from the file name
-                    date_str = member.name.split('.')[0][-10:]
-                    try:
-                        date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        print(member.name.split('.'))
-                    if date >= start_date and date <= end_date:
-                        print('{} ...'.format(date))
-                        # flag to record if the word was found in the file
-                        for i, line in enumerate(f.extractfile(member)):
-                            info = line.decode().split()
-                            try:
-                                word_dict[info[1]].append((date,
-                                                           int(info[-1])))
-                            except KeyError:
-                                try:
-                                    word_dict[info[1]] = [(date,
-                                                           int(info[-1]))]
-                                except ValueError:
-                                    continue
-
-    return word_dict
-
-
-def remove_duplicates(rank_list):
-    """ Remove values from duplicate days, using the smaller rank value from
-    duplicates
-    """
-    dates_seen = []
-    ranks_seen = []
-    for date, rank in rank_list:
-        if date in dates_seen:
-            ix = dates_seen.index(date)
-            if rank < ranks_seen[ix]:
-                ranks_seen[ix] = rank
-        else:
-            dates_seen.append(date)
-            ranks_seen.append(rank)
-    return list(zip(dates_seen, ranks_seen))
-
-
-def fill_missing_dates(rank_list, start_date, end_date, cutoff=100001):
-    """ Fill missing dates if the list of ranks is missing them, and set them
-    as the lowest possible value.
-    """
-    for key, values in rank_list.items():
-        if len(values) < (end_date - start_date).days + 1:
-            dates, ranks = zip(*values)
-            for date in daterange(start_date, end_date):
-                if date not in dates:
-                    values.append((date, cutoff))
-        values = sorted(values)
-        if len(values) > (end_date - start_date).days + 1:
-            values = remove_duplicates(values)
-        
-        rank_list[key] = values
-    return rank_list
-
-
-def brendan_whitney_test(dist1, dist2, cumulative=True):
-    """ My own test to determine the words that are most similar
-    """
-    if len(dist1) != len(dist2):
-        raise ValueError('Distributions do not have the same length')
-    
-    if cumulative:
-        cum_dist = 0
-        for i in range(len(dist1)):
-            cum_dist += (dist1[i] - dist2[i]) ** 2
-
-        return cum_dist
-    
-    max_dist = 0
-    for i in range(len(dist1)):
-        dist = (dist1[i] - dist2[i]) ** 2
-        if dist > max_dist:
-            max_dist = dist
-        # exponentially decay the weights of the distance between points
-        # cum_dist += np.exp(-i) * (dist1[i] - dist2[i]) ** 2
-    
-    return max_dist
+    dates = list(daterange(start_date, end_date))
+    # only the days in the range are read if the tarfile has been repacked
+    return rankarchive.get_rank_window(TARFILE, dates, cutoff)
 
 
-def test_rank(rank_list, word, n, test='bw'):
+def test_rank(window, word, n, test='bw'):
     """ Check each word for similarity to the distribution of the word we
     desire. Return the top n words.
     """
     tests = ['bw', 'ks']
-    if test not in test:
+    if test not in tests:
         raise ValueError('Invalid test used. Need to choose either {} or {}\
                          tests.'.format(*tests))
 
-    _, base_check = zip(*sorted(rank_list[word]))
-    # just subtract the mean of the dataset, to make the mean 0
-    std_base_check = [data - np.mean(base_check) for data in base_check]
-    
-    print(std_base_check)
-
-    words = []
-    for key, values in rank_list.items():
-        if key == word:
-            continue
-
-        _, test_check = zip(*sorted(values))
-        # move the data to a mean of 0
-        std_test_check = [data - np.mean(test_check) for data in test_check]
-        if test == 'bw':
-            score = brendan_whitney_test(std_base_check, std_test_check)
-        else:
-            score, _ = ks_2samp(std_base_check, std_test_check)
-        
-        words.append((score, key))
-        
-    words = sorted(words)
-    print(words[:n])
-    return words[:n]
+    base_row = window.vocab[word]
+    base_check = window.ranks[base_row]
+    # score every other word in the window at once
+    keys = window.words[:base_row] + window.words[base_row + 1:]
+    test_block = np.delete(window.ranks, base_row, axis=0)
 
+    if test == 'bw':
+        scores = bw_scores(base_check, test_block)
+    else:
+        scores = ks_scores(base_check, test_block)
 
-with open('data/{}-{}-full-data.pkl'.format(WORD, YEAR), 'rb') as f:
-    full_data = pickle.load(f, encoding='bytes')
+    words = top_n(scores, keys, n)
+    print(words)
+    return words
 
-median_data = []
-for date, _ in full_data:
-    if date.year == YEAR:
-        median_data.append(calc_prev_median(date, full_data))
 
-year_data = [(date, data) for date, data in full_data if date.year == YEAR]
+full_data = seriescache.load_full_data(WORD, YEAR, TARFILE)
 
-date, rank = zip(*year_data)
-_, _, u_bound, _ = zip(*median_data)
+date, rank, bounds = year_bounds(full_data, YEAR)
+year_data = list(zip(date, rank))
+u_bound = bounds.lower
 
 rank_arr = np.array(rank)
 ubound_arr = np.array(u_bound)
@@ -334,10 +227,9 @@ for end_date, shock_score, event_length in shock_events:
 
     main_date_plot(year_data, prev_date, final_date)
 
-    word_dict = get_word_ranks(prev_date, final_date)
-    complete_dict = fill_missing_dates(word_dict, prev_date, final_date)
-    
-    scores, words = zip(*test_rank(complete_dict, WORD, 10, test))
-    
-    comparison_date_plot(words, complete_dict, prev_date, final_date, test)
+    window = get_word_ranks(prev_date, final_date)
+
+    scores, words = zip(*test_rank(window, WORD, 10, test))
+
+    comparison_date_plot(words, window, prev_date, final_date, test)
 """
@@ -4,93 +4,187 @@
 # created on: 12-06-2018
 # filename: generate_word_list.py
 # author: brendan
-# last modified: 12-10-2018 15:24
+# last modified: 10-18-2026 16:05
 #-------------------------------------------------------------------------------
 """
-Generate a list of all the words in the tarfile for 2018
+Count how many days every word shows up on in each year of the tarfile, and
+generate the list of popular words that show up on every day of the years.
+The days are parsed across a pool of processes, and the census is saved so
+the years that were already counted don't have to be read again
 """
-import tarfile
-import datetime as dt
+import os
 import csv
+import collections
+import datetime as dt
+import concurrent.futures as cf
+import numpy as np
+import argparse
+import rankarchive
+
+Census = collections.namedtuple('Census', ['years', 'days', 'words', 'counts'])
+
+
+def count_days(batch):
+    """ Count the number of days in the batch every word shows up on
+    """
+    counts = collections.Counter()
+    for data in batch:
+        counts.update(rankarchive.parse_day(data).keys())
+    return counts
+
+
+def iter_batches(days, years, size):
+    """ Group the days of the years into batches of daily rank files, so each
+    task handed to the pool has enough work in it. Yields (year, batch)
+    """
+    batches = {}
+    for date, data in days:
+        if date.year not in years:
+            continue
+        print('{}...'.format(date))
+        batch = batches.setdefault(date.year, [])
+        batch.append(data)
+        if len(batch) == size:
+            yield date.year, batches.pop(date.year)
+    for year, batch in batches.items():
+        yield year, batch
+
+
+def count_batch(item):
+    """ Count a (year, batch) item on the pool, keeping the year with it
+    """
+    year, batch = item
+    return year, len(batch), count_days(batch)
+
+
+def census(tarfile_name, years, workers=None, size=16):
+    """ Count the days every word shows up on in each of the years, with the
+    daily rank files parsed across a pool of processes
+    """
+    years = sorted(years)
+    days = rankarchive.iter_days(tarfile_name, dt.datetime(years[0], 1, 1),
+                                 dt.datetime(years[-1], 12, 31))
+    year_counts = {year: collections.Counter() for year in years}
+    year_days = dict.fromkeys(years, 0)
+    with cf.ProcessPoolExecutor(max_workers=workers) as pool:
+        n_ahead = 2 * (workers or os.cpu_count())
+        for year, n_days, counts in rankarchive.ordered_map(
+                pool, count_batch, iter_batches(days, set(years), size),
+                n_ahead):
+            year_counts[year].update(counts)
+            year_days[year] += n_days
+
+    words = sorted(set().union(*year_counts.values()))
+    counts = np.zeros((len(words), len(years)), dtype=np.int32)
+    for j, year in enumerate(years):
+        counts[:, j] = [year_counts[year].get(word, 0) for word in words]
+    return Census(years, [year_days[year] for year in years], words, counts)
+
+
+def merge_census(old, new):
+    """ Merge two censuses of different years into one
+    """
+    years = old.years + new.years
+    words = sorted(set(old.words).union(new.words))
+    vocab = {word: i for i, word in enumerate(words)}
+    counts = np.zeros((len(words), len(years)), dtype=np.int32)
+    counts[[vocab[word] for word in old.words], :len(old.years)] = old.counts
+    counts[[vocab[word] for word in new.words], len(old.years):] = new.counts
+    order = np.argsort(years)
+    return Census([years[i] for i in order],
+                  [(old.days + new.days)[i] for i in order], words,
+                  counts[:, order])
+
+
+def write_census(filename, census):
+    """ Write the census as a csv with a column of counts for each year. The
+    second row has the number of days in each year
+    """
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['word'] + census.years)
+        writer.writerow(['#days'] + census.days)
+        for word, counts in zip(census.words, census.counts.tolist()):
+            writer.writerow([word] + counts)
+
+
+def read_census(filename):
+    """ Read a census written by write_census
+    """
+    with open(filename, newline='') as f:
+        reader = csv.reader(f)
+        years = [int(year) for year in next(reader)[1:]]
+        days = [int(n_days) for n_days in next(reader)[1:]]
+        words = []
+        counts = []
+        for row in reader:
+            words.append(row[0])
+            counts.append([int(count) for count in row[1:]])
+    counts = np.array(counts, dtype=np.int32).reshape(len(words), len(years))
+    return Census(years, days, words, counts)
+
+
+def update_census(filename, tarfile_name, years, workers=None):
+    """ Load the census saved in filename and count only the years that aren't
+    in it yet, saving the census again if anything was added
+    """
+    old = read_census(filename) if os.path.exists(filename) else None
+    missing = set(years) - set(old.years if old else [])
+    if not missing:
+        return old
+
+    new = census(tarfile_name, missing, workers)
+    if old is not None:
+        new = merge_census(old, new)
+    write_census(filename, new)
+    return new
+
+
+def popular_words(census, years, fraction=1.0):
+    """ Get the words that show up on at least the fraction of the days of
+    every one of the years
+    """
+    keep = np.ones(len(census.words), dtype=bool)
+    for year in years:
+        j = census.years.index(year)
+        keep &= census.counts[:, j] >= fraction * census.days[j]
+    return [census.words[i] for i in np.flatnonzero(keep)]
+
+
+def write_word_list(filename, words, n_rows=1000):
+    """ Write the words spread across n_rows rows, the way the VACC jobs read
+    them
+    """
+    row2words = {}
+    for i, word in enumerate(words):
+        row2words.setdefault(i % n_rows, []).append(word)
+
+    with open(filename, 'w') as wfile:
+        mywriter = csv.writer(wfile, delimiter=' ')
+        mywriter.writerows(row2words.values())
+
 
-YEAR = 2018
-THRESHOLD = 365
-TARFILE = 'top_daily_words_uni.tar_.gz'
-
-word2count2018 = {}
-word2count2017 = {}
-
-with tarfile.open(TARFILE, mode='r:gz') as f:
-    for member in f:
-        if member.isfile():
-            # parse the date from the file name
-            date_str = member.name.split('.')[0][-10:]
-            try:
-                date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-            except ValueError:
-                print(member.name.split('.'))
-            if date.year == YEAR:
-                print('{}...'.format(date))
-                # keep track of words already seen
-                seen2018 = set()
-                for line in f.extractfile(member):
-                    info = line.decode().split()
-                    # only add a word to word set if it doesn't already exist
-                    # in the set
-                    # skip the header row
-                    if info[1] in seen2018 or info[1] == 'Counts':
-                        continue
-                    try:
-                        word2count2018[info[1]] += 1
-                    except KeyError:
-                        word2count2018[info[1]] = 1
-                    seen2018.add(info[1])
-            elif date.year == YEAR-1:
-                print('{}...'.format(date))
-                # keep track of words already seen
-                seen2017 = set()
-                for line in f.extractfile(member):
-                    info = line.decode().split()
-                    # only add a word to word set if it doesn't already exist
-                    # in the set
-                    # skip the header row
-                    if info[1] in seen2017 or info[1] == 'Counts':
-                        continue
-                    try:
-                        word2count2017[info[1]] += 1
-                    except KeyError:
-                        word2count2017[info[1]] = 1
-                    seen2017.add(info[1])                
-
-sort2018 = sorted(word2count2018.items(), key=lambda x: x[1], reverse=True)
-sort2017 = sorted(word2count2017.items(), key=lambda x: x[1], reverse=True) 
-
-print(sort2018[:100])
-print(sort2017[:100])
-
-# only 304 days in 2018 for the data
-words2018 = set([word for word, count in sort2018 if count >= 304])
-# 2017 only has 364 days
-words2017 = set([word for word, count in sort2017 if count >= 364])
-
-my_words = words2018.intersection(words2017)
-print(my_words)
-print(len(my_words))
-
-row2words = {}
-counter=0
-for word in my_words:
-    if counter > 999:
-        counter = 0
-    try:
-        row2words[counter].append(word)
-    except KeyError:
-        row2words[counter] = [word]
-    counter += 1
-
-print(len(row2words.keys()))
-with open('popular_words.txt', 'w') as wfile:
-    mywriter = csv.writer(wfile, delimiter=' ')
-    mywriter.writerows(row2words.values())
-        
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Count the days each word shows up on and generate the "
+        "list of popular words")
+    parser.add_argument('years', nargs='*', type=int, default=[2017, 2018],
+                        help='the years the words have to show up in')
+    parser.add_argument('--tarfile', default='top_daily_words_uni.tar_.gz',
+                        help='the tarfile of daily ranks')
+    parser.add_argument('--census', default='word_census.csv',
+                        help='the census to reuse and add the years to')
+    parser.add_argument('--out', default='popular_words.txt',
+                        help='the file to write the popular words to')
+    parser.add_argument('--fraction', type=float, default=1.0,
+                        help='the fraction of the days a word has to show '
+                        'up on')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of processes, defaults to every core')
+    args = parser.parse_args()
 
+    word_census = update_census(args.census, args.tarfile, args.years,
+                                args.workers)
+    my_words = popular_words(word_census, args.years, args.fraction)
+    print(len(my_words))
+    write_word_list(args.out, my_words)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: jobstats.py
+# author: brendan
+# last modified: 10-18-2026 17:30
+#-------------------------------------------------------------------------------
+"""
+Record the wall time, CPU time and peak memory of each stage of a job, and of
+each word, when it is turned on. The totals are written to a JSON sidecar next
+to the job output, and the sidecars of every shard of a job can be summarized
+together
+"""
+import os
+import sys
+import json
+import time
+import resource
+import platform
+import threading
+import contextlib
+import datetime as dt
+import argparse
+
+# the records of the stages, None while the stats are turned off
+_RECORDS = None
+_LOCAL = threading.local()
+_START = None
+
+
+def enable():
+    """ Start recording the stages of this process
+    """
+    global _RECORDS, _START
+    _RECORDS = []
+    _START = (time.perf_counter(), time.process_time(),
+              dt.datetime.now().isoformat())
+
+
+def enabled():
+    """ Check if the stages are being recorded
+    """
+    return _RECORDS is not None
+
+
+def peak_rss():
+    """ The peak resident memory of the process so far, in KB
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextlib.contextmanager
+def stage(name, word=None):
+    """ Record the wall time, CPU time of the thread and peak memory of the
+    code run inside. Stages can be nested, and a nested stage is counted
+    against the word of the stage around it
+    """
+    if _RECORDS is None:
+        yield
+        return
+
+    words = getattr(_LOCAL, 'words', None)
+    if words is None:
+        words = _LOCAL.words = []
+    if word is None and words:
+        word = words[-1]
+    words.append(word)
+    rss = peak_rss()
+    wall = time.perf_counter()
+    cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.thread_time() - cpu
+        words.pop()
+        end_rss = peak_rss()
+        _RECORDS.append((name, word, wall, cpu, end_rss, end_rss - rss))
+
+
+def take():
+    """ Take the records made so far, so a worker can hand them back to the
+    parent process
+    """
+    global _RECORDS
+    records = _RECORDS or []
+    if _RECORDS is not None:
+        _RECORDS = []
+    return records
+
+
+def totals(records):
+    """ Add the records up by stage, and by word and stage for the records
+    that have a word
+    """
+    stages = {}
+    words = {}
+    for name, word, wall, cpu, end_rss, growth in records:
+        total = stages.setdefault(name, {'count': 0, 'wall': 0.0, 'cpu': 0.0,
+                                         'peak_rss_kb': 0,
+                                         'rss_growth_kb': 0})
+        total['count'] += 1
+        total['wall'] += wall
+        total['cpu'] += cpu
+        total['peak_rss_kb'] = max(total['peak_rss_kb'], end_rss)
+        total['rss_growth_kb'] += growth
+        if word is not None:
+            word_total = words.setdefault(word, {}).setdefault(
+                name, {'wall': 0.0, 'cpu': 0.0})
+            word_total['wall'] += wall
+            word_total['cpu'] += cpu
+    return stages, words
+
+
+def sidecar_name(outfile):
+    """ The name of the stats sidecar that goes with a job output
+    """
+    return '{}.stats.json'.format(os.path.splitext(outfile)[0])
+
+
+def write_sidecar(outfile, job, records=None):
+    """ Write the totals of the records, by default the ones made in this
+    process, to the sidecar of the job output
+    """
+    if records is None:
+        records = take()
+    stages, words = totals(records)
+    wall, cpu, started = _START or (time.perf_counter(), time.process_time(),
+                                    None)
+    stats = {'job': job, 'host': platform.node(), 'argv': sys.argv,
+             'started': started, 'wall': time.perf_counter() - wall,
+             'cpu': time.process_time() - cpu, 'peak_rss_kb': peak_rss(),
+             'stages': stages, 'words': words}
+    with open(sidecar_name(outfile), 'w') as f:
+        json.dump(stats, f, indent=1, sort_keys=True)
+    return sidecar_name(outfile)
+
+
+def summarize(filenames, n=10):
+    """ Add up the sidecars of every shard of a job, printing the totals of
+    each stage, the slowest shards and the slowest words
+    """
+    stages = {}
+    words = {}
+    shards = []
+    for filename in filenames:
+        with open(filename) as f:
+            stats = json.load(f)
+        shards.append((stats['wall'], stats['job'], stats['host'],
+                       stats['peak_rss_kb']))
+        for name, total in stats['stages'].items():
+            merged = stages.setdefault(name, {'count': 0, 'wall': 0.0,
+                                              'cpu': 0.0, 'peak_rss_kb': 0})
+            merged['count'] += total['count']
+            merged['wall'] += total['wall']
+            merged['cpu'] += total['cpu']
+            merged['peak_rss_kb'] = max(merged['peak_rss_kb'],
+                                        total['peak_rss_kb'])
+        for word, word_stages in stats['words'].items():
+            # the stages of a word nest, so the outer one has its whole time
+            words[word] = words.get(word, 0) + max(
+                total['wall'] for total in word_stages.values())
+
+    print('{} shards, {:.1f}s of wall time'.format(
+        len(shards), sum(shard[0] for shard in shards)))
+    print('{:<16} {:>10} {:>12} {:>12} {:>12}'.format(
+        'stage', 'count', 'wall (s)', 'cpu (s)', 'peak (MB)'))
+    for name, total in sorted(stages.items(), key=lambda x: -x[1]['wall']):
+        print('{:<16} {:>10} {:>12.3f} {:>12.3f} {:>12.1f}'.format(
+            name, total['count'], total['wall'], total['cpu'],
+            total['peak_rss_kb'] / 1024))
+
+    print('Slowest shards:')
+    for wall, job, host, rss in sorted(shards, reverse=True)[:n]:
+        print('{:>10.1f}s {:>8.1f}MB {} on {}'.format(wall, rss / 1024, job,
+                                                      host))
+    if words:
+        print('Slowest words:')
+        for word, wall in sorted(words.items(), key=lambda x: -x[1])[:n]:
+            print('{:>10.4f}s {}'.format(wall, word))
+    return stages, words
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Summarize the stats sidecars of the shards of a job")
+    parser.add_argument('sidecars', nargs='+',
+                        help='the <JOBID>.stats.json files to add up')
+    parser.add_argument('-n', type=int, default=10,
+                        help='the number of slowest shards and words to list')
+    args = parser.parse_args()
+
+    summarize(args.sidecars, args.n)
@@ -4,101 +4,42 @@
 # created on: 11-12-2018
 # filename: makewordplot.py
 # author: brendan
-# last modified: 12-11-2018 21:26
+# last modified: 10-19-2026 10:45
 #-------------------------------------------------------------------------------
 """
 Parse the rank file to make a plot of the rank of a particular word
 """
-import tarfile
 import numpy as np
-import datetime as dt
-import dateutil.relativedelta as rdelta
 import matplotlib.pyplot as plt
 import matplotlib.dates as dts
-import pickle
 import argparse
+import rankpyramid
+import wordmemo
 
+TARFILE = 'top_daily_words_uni.tar_.gz'
+STORE = 'rank_store'
 
-def calc_prev_median(date, data, k=1.5):
-    """ Calculate the median for a certain date from the data of the previous
-    six months of data.
-    """
-    earliest_date = date - rdelta.relativedelta(months=6)
-    # keep only the data in this range
-    my_data = []
-    for check_date, rank in data:
-        if check_date >= earliest_date and check_date <= date:
-            my_data.append(rank)
-    
-    median = np.median(my_data)
-    first_quart = np.percentile(my_data, 25)
-    third_quart = np.percentile(my_data, 75)
-    IQR = third_quart - first_quart
-
-    lower_bound = first_quart - k * IQR
-    # make sure the lower bound doesn't go below 1
-    lower_bound = lower_bound if lower_bound > 1 else 1
-    upper_bound = third_quart + k * IQR
-
-    return (date, median, lower_bound, upper_bound)
 
-
-def main(WORD, LOG, YEAR, CUTOFF=100001):
-    """ Run the program with the 3 global varables taken from the arg parsing
+def baseline_plot(rdate, rank, bounds, WORD, YEAR, LOG=False, filename=None):
+    """ Plot the rank of the word against its rolling median and bounds, and
+    save the plot to filename, which defaults to the plots directory
     """
-    try:
-        with open('data/{}-{}-full-data.pkl'.format(WORD, YEAR), 'rb') as f:
-            full_data = pickle.load(f, encoding='bytes')
-    except:
-        full_data = []
-        with tarfile.open(TARFILE, mode='r:gz') as f:
-            for member in f:
-                if member.isfile():
-                    # parse the date from the file name
-                    date_str = member.name.split('.')[0][-10:]
-                    try:
-                        date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        print(member.name.split('.'))
-                    if date.year == YEAR or date.year == YEAR - 1:
-                        # flag to record if the word was found in the file
-                        found = False
-                        for line in f.extractfile(member):
-                            if WORD in line.decode():
-                                rank = int(line.decode().split()[-1])
-                                full_data.append((date, rank))
-                                found = True
-                                break
-                        # if the word isn't found give it the max rank
-                        if not found:
-                            rank = CUTOFF
-                            full_data.append((date, rank))
-
-        full_data = sorted(full_data)
-        with open('data/{}-{}-full-data.pkl'.format(WORD, YEAR), 'wb') as f:
-            pickle.dump(full_data, f)
-
-
     fig, ax = plt.subplots()
     loc = dts.MonthLocator()
     myFmt = dts.DateFormatter('%m')
     
-    median_plot = []
-    for date, _ in full_data:
-        if date.year == YEAR:
-            median_plot.append(calc_prev_median(date, full_data))
-
-    # make the plots only for 2018
-    plot_data = full_data
-    plot_data = [(date, rank) for date, rank in full_data if date.year == YEAR]
-    
-    rdate, rank = zip(*plot_data)
-
-    mdate, median, upper_bound, lower_bound = zip(*median_plot)
+    mdate = rdate
+    median = bounds.median
+    lower_bound = bounds.lower
+    upper_bound = bounds.upper
 
     # calculate the standard deviation, to note points that rise much higher
     # the typical values of the plot
-    filename = 'plots/{}-{}-baseline-comparison'.format(WORD, YEAR)
+    if filename is None:
+        filename = 'plots/{}-{}-baseline-comparison'.format(WORD, YEAR)
+        if LOG:
+            filename = '{}-LOG'.format(filename)
+        filename = '{}.jpg'.format(filename)
     ylabel = 'Rank'
 
     if LOG:
@@ -107,7 +48,6 @@ def main(WORD, LOG, YEAR, CUTOFF=100001):
         upper_bound = np.log10(upper_bound)
         lower_bound = np.log10(lower_bound)
         ylabel = 'Log Rank'
-        filename = '{}-LOG'.format(filename)
 
     ax.plot(rdate, rank, 'k-')
     ax.plot(mdate, median, 'r--')
@@ -120,9 +60,47 @@ def main(WORD, LOG, YEAR, CUTOFF=100001):
     ax.invert_yaxis()
     ax.xaxis.set_major_formatter(myFmt)
     ax.set_title('Rank plot for {} in {}'.format(WORD, YEAR))
-    fig.savefig('{}.jpg'.format(filename))
+    fig.savefig(filename)
+    plt.close(fig)
+
+
+def pyramid_plot(pyramid, WORD, YEAR, LOG=False, filename=None):
+    """ Plot the median rank of the word in each week or month of the pyramid,
+    with the min and max of each period shaded around it
+    """
+    pdate, low, median, high = rankpyramid.word_summary(pyramid, WORD, YEAR)
+    if filename is None:
+        filename = 'plots/{}-{}-{}'.format(WORD, YEAR, pyramid.level)
+        if LOG:
+            filename = '{}-LOG'.format(filename)
+        filename = '{}.jpg'.format(filename)
+    ylabel = 'Rank'
+    if LOG:
+        low, median, high = np.log10(low), np.log10(median), np.log10(high)
+        ylabel = 'Log Rank'
+
+    fig, ax = plt.subplots()
+    ax.plot(pdate, median, 'k-')
+    ax.fill_between(pdate, low, high, color='k', alpha=0.2, linewidth=0)
+    ax.set_xlabel('Month')
+    ax.set_ylabel(ylabel)
+    ax.invert_yaxis()
+    ax.xaxis.set_major_formatter(dts.DateFormatter('%m'))
+    ax.set_title('{}ly rank plot for {} in {}'.format(
+        pyramid.level.capitalize(), WORD, YEAR))
+    fig.savefig(filename)
     plt.close(fig)
 
+
+def main(WORD, LOG, YEAR, CUTOFF=100001):
+    """ Run the program with the 3 global varables taken from the arg parsing
+    """
+    # the ranks and bounds are kept in memory between calls, and read straight
+    # out of the rank store if there is one
+    rdate, rank, bounds = wordmemo.word_bounds(WORD, YEAR, TARFILE, CUTOFF,
+                                               STORE)
+    baseline_plot(rdate, rank, bounds, WORD, YEAR, LOG)
+
 if __name__ == '__main__':
     """ put the relevant code in the if statement, so I can import
     calc_prev_median without running the full script, and passing in command 
@@ -134,8 +112,13 @@ if __name__ == '__main__':
                         help='the word for plotting')
     parser.add_argument('log', nargs='?', default=False,
                         help='boolean flag to produce a log plot')
-    parser.add_argument('year', nargs='?', default=2018,
+    parser.add_argument('year', nargs='?', default=2018, type=int,
                         help='the year of concern for the plot')
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to read the ranks from')
+    parser.add_argument('--level', choices=['week', 'month'],
+                        help='plot the weekly or monthly summaries of the '
+                        'rank pyramid instead of the daily baseline')
     args = parser.parse_args()
 
     home_directory = 'top_daily_words_uni'
@@ -146,7 +129,12 @@ if __name__ == '__main__':
     print(LOG)
     YEAR = args.year
     print(YEAR)
+    STORE = args.store
     # the number to multiply the IQR by to indicate extreme values vs. outliers
 
-    main(WORD, LOG, YEAR)
+    if args.level:
+        pyramid_plot(rankpyramid.load_pyramid(STORE, args.level), WORD, YEAR,
+                     LOG)
+    else:
+        main(WORD, LOG, YEAR)
 
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: rankarchive.py
+# author: brendan
+# last modified: 10-18-2026 20:55
+#-------------------------------------------------------------------------------
+"""
+Read the daily rank files out of the top_daily_words_uni archive, so every
+script parses the days the same way. The tarfile can be repacked into a day
+archive with one gzip block per day and a date index, so a range of dates can
+be read without decompressing the whole tarfile, and the days can be
+decompressed in parallel. Only the decompression overlaps, since zlib lets go
+of the GIL, the parsing of the days still runs one at a time
+"""
+import os
+import bisect
+import gzip
+import zlib
+import collections
+import numpy as np
+import concurrent.futures as cf
+import tarfile
+import datetime as dt
+import argparse
+import jobstats
+
+
+def parse_date(name):
+    """ Parse the date from the name of a daily rank file, returning None for
+    the files that aren't daily ranks
+    """
+    date_str = name.split('.')[0][-10:]
+    try:
+        return dt.datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def iter_tar_days(tarfile_name, start_date=None, end_date=None):
+    """ Iterate through the tarfile yielding the date and the raw contents of
+    each daily rank file between start_date and end_date
+    """
+    with tarfile.open(tarfile_name, mode='r:gz') as f:
+        for member in f:
+            if not member.isfile():
+                continue
+            date = parse_date(member.name)
+            if date is None:
+                continue
+            if start_date is not None and date < start_date:
+                continue
+            if end_date is not None and date > end_date:
+                continue
+            with jobstats.stage('gzip'):
+                data = f.extractfile(member).read()
+            yield date, data
+
+
+def day_archive_name(tarfile_name):
+    """ Get the name of the repacked day archive that goes with the tarfile
+    """
+    base = os.path.basename(tarfile_name).split('.')[0]
+    return os.path.join(os.path.dirname(tarfile_name),
+                        '{}.days.gz'.format(base))
+
+
+def index_name(archive_name):
+    """ Get the name of the date index of a day archive
+    """
+    return '{}.idx'.format(archive_name[:-len('.gz')])
+
+
+def ordered_map(pool, func, items, ahead):
+    """ Map func over items on the pool, yielding the results in order while
+    only keeping ahead items in flight at once
+    """
+    futures = collections.deque()
+    for item in items:
+        futures.append(pool.submit(func, item))
+        if len(futures) >= ahead:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+def compress_day(day):
+    """ Compress a day into its own gzip block
+    """
+    date, data = day
+    return date, gzip.compress(data)
+
+
+def repack(tarfile_name, archive_name=None, workers=None):
+    """ Repack the tarfile into a day archive, with each daily rank file in its
+    own gzip block, and write the date index of the block offsets next to it.
+    The blocks are compressed on a pool of threads while the tarfile is read
+    """
+    if archive_name is None:
+        archive_name = day_archive_name(tarfile_name)
+    workers = workers or os.cpu_count()
+
+    index = []
+    with open(archive_name, 'wb') as f, cf.ThreadPoolExecutor(workers) as pool:
+        days = iter_tar_days(tarfile_name)
+        for date, block in ordered_map(pool, compress_day, days, 2 * workers):
+            print('{} ...'.format(date))
+            index.append((date, f.tell(), len(block)))
+            f.write(block)
+
+    with open(index_name(archive_name), 'w') as f:
+        for date, offset, length in sorted(index):
+            f.write('{} {} {}\n'.format(date.strftime('%Y-%m-%d'), offset,
+                                        length))
+    return archive_name
+
+
+def load_index(archive_name):
+    """ Load the date index of a day archive as a sorted list of
+    (date, offset, length)
+    """
+    index = []
+    with open(index_name(archive_name)) as f:
+        for line in f:
+            date_str, offset, length = line.split()
+            index.append((dt.datetime.strptime(date_str, '%Y-%m-%d'),
+                          int(offset), int(length)))
+    return index
+
+
+def index_range(index, start_date=None, end_date=None):
+    """ Slice the index down to the days between start_date and end_date
+    """
+    dates = [date for date, _, _ in index]
+    lo = 0 if start_date is None else bisect.bisect_left(dates, start_date)
+    hi = len(index) if end_date is None else bisect.bisect_right(dates,
+                                                                 end_date)
+    return index[lo:hi]
+
+
+def iter_archive_days(archive_name, start_date=None, end_date=None,
+                      workers=None, parse=False):
+    """ Iterate through the days of a day archive between start_date and
+    end_date in date order, only decompressing the days in the range. The
+    blocks are decompressed on a pool of threads. The days are parsed if parse
+    is set as they are yielded, since parse_day holds the GIL and gets nothing
+    from the threads
+    """
+    index = index_range(load_index(archive_name), start_date, end_date)
+    workers = workers or os.cpu_count()
+
+    # pread on one shared descriptor is safe across the threads
+    fd = os.open(archive_name, os.O_RDONLY)
+
+    def read_day(entry):
+        date, offset, length = entry
+        # every block is a gzip member of its own
+        with jobstats.stage('gzip'):
+            data = zlib.decompress(os.pread(fd, length, offset), 31)
+        return date, data
+
+    try:
+        with cf.ThreadPoolExecutor(workers) as pool:
+            for date, data in ordered_map(pool, read_day, index, 2 * workers):
+                yield date, parse_day(data) if parse else data
+    finally:
+        os.close(fd)
+
+
+def iter_days(tarfile_name, start_date=None, end_date=None, workers=None):
+    """ Iterate through the daily rank files between start_date and end_date,
+    using the repacked day archive if there is one and the tarfile otherwise
+    """
+    archive_name = day_archive_name(tarfile_name)
+    if os.path.exists(index_name(archive_name)):
+        return iter_archive_days(archive_name, start_date, end_date, workers)
+    return iter_tar_days(tarfile_name, start_date, end_date)
+
+
+def iter_parsed_days(tarfile_name, start_date=None, end_date=None,
+                     workers=None):
+    """ Iterate through the days between start_date and end_date, parsed into
+    dictionaries of word to rank
+    """
+    archive_name = day_archive_name(tarfile_name)
+    if os.path.exists(index_name(archive_name)):
+        return iter_archive_days(archive_name, start_date, end_date, workers,
+                                 parse=True)
+    return ((date, parse_day(data)) for date, data in
+            iter_tar_days(tarfile_name, start_date, end_date))
+
+
+def parse_day(data):
+    """ Parse the contents of a daily rank file into a dictionary of word to
+    rank. If a word shows up more than once, keep the smaller rank
+    """
+    ranks = {}
+    with jobstats.stage('parse'):
+        for line in data.decode().splitlines():
+            info = line.split()
+            if len(info) < 2:
+                continue
+            # skip the header row
+            try:
+                rank = int(info[-1])
+            except ValueError:
+                continue
+            word = info[1]
+            if word not in ranks or rank < ranks[word]:
+                ranks[word] = rank
+    return ranks
+
+
+RankWindow = collections.namedtuple('RankWindow', ['words', 'vocab', 'dates',
+                                                   'ranks'])
+
+
+def build_window(days, dates, cutoff=100001):
+    """ Build the dense words x dates block of ranks out of the parsed days.
+    Every word that shows up on any of the dates gets a row, pre-filled with
+    the cutoff, and duplicate days keep the smaller rank. Dates the archive
+    has no day for are left out of the window, the same as the word series
+    """
+    return build_windows(days, [dates], cutoff)[0]
+
+
+def build_windows(days, date_lists, cutoff=100001):
+    """ Build a dense window for each list of dates out of a single pass over
+    the parsed days
+    """
+    # map each date to the windows and columns it goes in
+    date_ix = {}
+    for window, dates in enumerate(date_lists):
+        for col, date in enumerate(dates):
+            date_ix.setdefault(date, []).append((window, col))
+
+    vocabs = [{} for _ in date_lists]
+    blocks = [np.full((1024, len(dates)), cutoff, dtype=np.int32)
+              for dates in date_lists]
+    found = [np.zeros(len(dates), dtype=bool) for dates in date_lists]
+    for date, day in days:
+        if date not in date_ix:
+            continue
+        vals = np.fromiter(day.values(), dtype=np.int32, count=len(day))
+        for window, col in date_ix[date]:
+            found[window][col] = True
+            vocab = vocabs[window]
+            rows = np.fromiter((vocab.setdefault(word, len(vocab))
+                                for word in day),
+                               dtype=np.int64, count=len(day))
+            ranks = blocks[window]
+            if len(vocab) > ranks.shape[0]:
+                # double the rows until every word fits
+                size = ranks.shape[0]
+                while size < len(vocab):
+                    size *= 2
+                grown = np.full((size, ranks.shape[1]), cutoff,
+                                dtype=np.int32)
+                grown[:ranks.shape[0]] = ranks
+                ranks = blocks[window] = grown
+            ranks[rows, col] = np.minimum(ranks[rows, col], vals)
+
+    windows = []
+    for vocab, ranks, dates, cols in zip(vocabs, blocks, date_lists, found):
+        words = sorted(vocab, key=vocab.get)
+        # drop the dates missing from the archive instead of giving every
+        # word the cutoff on them
+        windows.append(RankWindow(words, vocab,
+                                  [date for date, col in zip(dates, cols)
+                                   if col],
+                                  ranks[:len(words), cols]))
+    return windows
+
+
+def slice_window(window, start_date, end_date, cutoff=100001):
+    """ Cut a window down to the dates between start_date and end_date,
+    keeping only the words that show up on those dates
+    """
+    cols = [i for i, date in enumerate(window.dates)
+            if date >= start_date and date <= end_date]
+    ranks = window.ranks[:, cols]
+    rows = np.flatnonzero((ranks < cutoff).any(axis=1))
+    words = [window.words[row] for row in rows]
+    vocab = {word: i for i, word in enumerate(words)}
+    return RankWindow(words, vocab, [window.dates[i] for i in cols],
+                      ranks[rows])
+
+
+def iter_interval_days(tarfile_name, intervals, workers=None):
+    """ Iterate through the parsed days that fall in any of the sorted,
+    non-overlapping (start_date, end_date) intervals. The day archive only
+    reads the days in the intervals, and the tarfile is read a single time
+    """
+    archive_name = day_archive_name(tarfile_name)
+    if os.path.exists(index_name(archive_name)):
+        for start_date, end_date in intervals:
+            for day in iter_archive_days(archive_name, start_date, end_date,
+                                         workers, parse=True):
+                yield day
+        return
+
+    starts = [start_date for start_date, _ in intervals]
+    for date, data in iter_tar_days(tarfile_name, intervals[0][0],
+                                    intervals[-1][1]):
+        i = bisect.bisect_right(starts, date) - 1
+        if i >= 0 and date <= intervals[i][1]:
+            yield date, parse_day(data)
+
+
+def get_rank_window(tarfile_name, dates, cutoff=100001):
+    """ Read the dense window of ranks for the dates out of the archive
+    """
+    days = iter_parsed_days(tarfile_name, min(dates), max(dates))
+    return build_window(days, dates, cutoff)
+
+
+def get_full_data(words, tarfile_name, year, cutoff=100001):
+    """ Read through the days of the year and the year before a single time
+    and gather the (date, rank) data for every word in words. Each day is
+    parsed once into a word to rank dictionary, so every word is an exact
+    lookup. Returns a dictionary of word to sorted rank data
+    """
+    full_data = {word: [] for word in words}
+    start_date = dt.datetime(year - 1, 1, 1)
+    end_date = dt.datetime(year, 12, 31)
+    for date, ranks in iter_parsed_days(tarfile_name, start_date, end_date):
+        for word in full_data:
+            # if the word isn't found give it the max rank
+            full_data[word].append((date, ranks.get(word, cutoff)))
+
+    for word in full_data:
+        full_data[word] = sorted(full_data[word])
+    return full_data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Repack the daily rank tarfile into an indexed day archive")
+    parser.add_argument('tarfile', help='the tarfile of daily ranks')
+    parser.add_argument('archive', nargs='?',
+                        help='the day archive to write')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of compression threads')
+    args = parser.parse_args()
+
+    repack(args.tarfile, args.archive, args.workers)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: rankpyramid.py
+# author: brendan
+# last modified: 10-19-2026 10:05
+#-------------------------------------------------------------------------------
+"""
+Summarize the daily ranks of the rank store by week and by month, keeping the
+min, median and max rank of every word in each period. The summaries sit next
+to the store, so a year long plot only needs the weekly points, and a screen
+of the whole vocabulary can check the weeks first and only read the daily
+ranks of the words that might have a shock
+"""
+import os
+import json
+import collections
+import datetime as dt
+import numpy as np
+import argparse
+import rankstore
+from baseline import block_bounds
+from shockdetector import calc_store_shocks
+
+PYRAMID_FILE = 'pyramid-{}.npy'
+PYRAMID_META = 'pyramid-{}.json'
+STATS = ['min', 'median', 'max']
+
+Pyramid = collections.namedtuple('Pyramid', ['level', 'periods', 'rows',
+                                             'stats', 'words', 'vocab'])
+
+
+def period_start(date, level):
+    """ Get the first day of the week (a Monday) or month the date is in
+    """
+    if level == 'week':
+        return date - dt.timedelta(date.weekday())
+    if level == 'month':
+        return date.replace(day=1)
+    raise ValueError('Unknown level {}'.format(level))
+
+
+def period_rows(dates, level):
+    """ Split the sorted dates of the store into periods. Returns the first
+    day of every period and the rows they start on, with the row just past the
+    end on the end
+    """
+    periods = []
+    rows = []
+    for row, date in enumerate(dates):
+        start = period_start(date, level)
+        if not periods or periods[-1] != start:
+            periods.append(start)
+            rows.append(row)
+    rows.append(len(dates))
+    return periods, np.array(rows)
+
+
+def build_pyramid(store_dir, levels=('week', 'month'), chunk=16384):
+    """ Build the min, median and max of every word in every period of each
+    level, from the daily ranks of the store in store_dir
+    """
+    store = rankstore.load_store(store_dir)
+    n_words = len(store.words)
+    for level in levels:
+        print('{} ...'.format(level))
+        periods, rows = period_rows(store.dates, level)
+        stats = np.lib.format.open_memmap(
+            os.path.join(store_dir, PYRAMID_FILE.format(level)), mode='w+',
+            dtype=np.float32, shape=(len(STATS), len(periods), n_words))
+        for col in range(0, n_words, chunk):
+            block = np.array(store.ranks[:, col:col + chunk])
+            stats[0, :, col:col + chunk] = np.minimum.reduceat(block,
+                                                               rows[:-1])
+            stats[2, :, col:col + chunk] = np.maximum.reduceat(block,
+                                                               rows[:-1])
+            for i in range(len(periods)):
+                stats[1, i, col:col + chunk] = np.median(
+                    block[rows[i]:rows[i + 1]], axis=0)
+        stats.flush()
+        del stats
+
+        meta = {'n_days': len(store.dates), 'n_words': n_words,
+                'periods': [period.strftime('%Y-%m-%d') for period in periods],
+                'rows': rows.tolist()}
+        with open(os.path.join(store_dir, PYRAMID_META.format(level)),
+                  'w') as f:
+            json.dump(meta, f)
+
+
+def load_pyramid(store_dir, level, store=None):
+    """ Load a level of the pyramid, with the stats opened as a memmap. The
+    pyramid has to be built again once days are appended to the store
+    """
+    if store is None:
+        store = rankstore.load_store(store_dir)
+    with open(os.path.join(store_dir, PYRAMID_META.format(level))) as f:
+        meta = json.load(f)
+    if meta['n_days'] != len(store.dates) or \
+            meta['n_words'] != len(store.words):
+        raise ValueError('The {} pyramid is out of date with the store, it '
+                         'needs to be built again'.format(level))
+
+    periods = [dt.datetime.strptime(period, '%Y-%m-%d')
+               for period in meta['periods']]
+    stats = np.load(os.path.join(store_dir, PYRAMID_FILE.format(level)),
+                    mmap_mode='r')
+    return Pyramid(level, periods, np.array(meta['rows']), stats, store.words,
+                   store.vocab)
+
+
+def word_summary(pyramid, word, year=None):
+    """ Get the periods of the word along with its min, median and max rank in
+    each of them, only for the periods starting in the year if one is given
+    """
+    ix = np.arange(len(pyramid.periods))
+    if year is not None:
+        ix = ix[[period.year == year for period in pyramid.periods]]
+    periods = [pyramid.periods[i] for i in ix]
+    col = pyramid.vocab[word]
+    return (periods,) + tuple(np.array(pyramid.stats[j, ix, col])
+                              for j in range(len(STATS)))
+
+
+def screen_words(pyramid, year, k=1.5, months=6, chunk=16384):
+    """ Find the words that could have a shock in the year from the pyramid
+    alone. The rolling bounds are worked out over the period mins, and a
+    word is kept if its min rank in any period of the year goes below the
+    lower bound. This is only a screen, a shock that barely crosses the daily
+    bound can be missed. Returns the columns of the words that are kept
+    """
+    periods = pyramid.periods
+    in_range = [i for i, period in enumerate(periods)
+                if period.year == year or period.year == year - 1]
+    years = [periods[i].year for i in in_range]
+    if year not in years:
+        raise ValueError('The pyramid has no periods in {}'.format(year))
+    start = years.index(year)
+    dates = [periods[i] for i in in_range]
+
+    keep = []
+    for col in range(0, len(pyramid.words), chunk):
+        mins = np.array(pyramid.stats[0, in_range, col:col + chunk])
+        bounds = block_bounds(dates, mins, k, months, start=start)
+        low = (mins[start:] < bounds.lower).any(axis=0)
+        keep.append(col + np.flatnonzero(low))
+    return np.concatenate(keep)
+
+
+def screen_shocks(store_dir, year, level='week', chunk=16384):
+    """ Screen the whole vocabulary on the pyramid, then work out the shock
+    scores of just the words that were kept from their daily ranks. Returns
+    the (word, score) of every kept word with a shock
+    """
+    store = rankstore.load_store(store_dir)
+    pyramid = load_pyramid(store_dir, level, store)
+    cols = screen_words(pyramid, year, chunk=chunk)
+    print('Kept {} of {} words'.format(len(cols), len(store.words)))
+    words = [store.words[col] for col in cols]
+    scores = []
+    for i in range(0, len(words), chunk):
+        scores.extend(zip(words[i:i + chunk],
+                          calc_store_shocks(store, words[i:i + chunk], year)))
+    return [(word, score) for word, score in scores if score > 0]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Build or screen the weekly and monthly rank pyramid")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='build the pyramid')
+    build_parser.add_argument('store', help='the rank store')
+    build_parser.add_argument('levels', nargs='*', default=['week', 'month'],
+                              help='the levels to build')
+    screen_parser = subparsers.add_parser(
+        'screen', help='find the shocks of the year through the pyramid')
+    screen_parser.add_argument('store', help='the rank store')
+    screen_parser.add_argument('year', type=int, help='the year to screen')
+    screen_parser.add_argument('outfile', help='the file to write the scores')
+    screen_parser.add_argument('--level', default='week',
+                               help='the level to screen on')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_pyramid(args.store, args.levels)
+    else:
+        with open(args.outfile, 'w') as sfile:
+            for word, shock_val in screen_shocks(args.store, args.year,
+                                                 args.level):
+                sfile.write('{},{}\n'.format(word, shock_val))
@@ -4,32 +4,196 @@
 # created on: 12-09-2018
 # filename: rankshock.py
 # author: brendan
-# last modified: 12-11-2018 13:04
+# last modified: 10-19-2026 09:10
 #-------------------------------------------------------------------------------
 """
-Rank the shock value of certain words on Twitter
+Rank the shock value of certain words on Twitter. The word,score lines of any
+number of job outputs are streamed through, keeping only the top scores of
+each category, or merged into a results table sorted by score, so the top of
+a category can be read without loading the whole table
 """
+import os
+import json
+import heapq
+import numpy as np
+import argparse
+
+CATEGORIES = ['user', 'hashtag', 'word', 'missing']
+SCORES_FILE = 'scores.npy'
+OFFSETS_FILE = 'offsets.npy'
+WORDS_FILE = 'words.bin'
+META_FILE = 'meta.json'
+
+
 def sort_scores(wordlist):
     return sorted(wordlist, key=lambda x: x[1], reverse=True)
 
 
-missing_words = []
-user_names = []
-hash_tags = []
-words = []
-with open('popular-scores.txt', 'r') as myfile:
-    for line in myfile:
-        word, score = line.strip().split(',')
-        if score == 'nan':
-            missing_words.append(word)
-        elif '@' in word:
-            user_names.append((word, float(score)))
-        elif '#' in word:
-            hash_tags.append((word, float(score)))
-        else:
-            words.append((word, float(score)))
-
-print(missing_words)
-print(sort_scores(user_names)[:10])
-print(sort_scores(hash_tags)[:10])
-print(sort_scores(words)[:10])
+def category(word, score):
+    """ Get the category of a word, user names, hash tags or plain words, with
+    the words without a score as missing
+    """
+    if score != score:
+        return 'missing'
+    if '@' in word:
+        return 'user'
+    if '#' in word:
+        return 'hashtag'
+    return 'word'
+
+
+def iter_scores(filenames):
+    """ Stream the (word, score) pairs out of the word,score lines of every
+    file. The score is nan for the words that couldn't be scored
+    """
+    for filename in filenames:
+        with open(filename, 'r') as myfile:
+            for line in myfile:
+                # split on the last comma, in case the word has one in it
+                word, _, score = line.strip().rpartition(',')
+                if not word:
+                    continue
+                try:
+                    yield word, float(score)
+                except ValueError:
+                    continue
+
+
+def top_scores(scores, n=10):
+    """ Keep the n highest scores of each category in a heap as the scores
+    stream past. A word scored by more than one job keeps its highest score,
+    and a word is only missing if no job scored it. Returns the missing words
+    and the sorted top scores of each category
+    """
+    heaps = {cat: [] for cat in CATEGORIES[:-1]}
+    in_heap = {cat: {} for cat in CATEGORIES[:-1]}
+    # a job may miss a word that another one scores, so the missing words are
+    # only known once every score has been read
+    missing_words = {}
+    scored = set()
+    for word, score in scores:
+        cat = category(word, score)
+        if cat == 'missing':
+            missing_words[word] = None
+            continue
+        scored.add(word)
+        heap = heaps[cat]
+        in_heap_words = in_heap[cat]
+        # a word scored by more than one job only gets one spot
+        if word in in_heap_words:
+            if score > in_heap_words[word]:
+                heap[heap.index((in_heap_words[word], word))] = (score, word)
+                heapq.heapify(heap)
+                in_heap_words[word] = score
+            continue
+        if len(heap) < n:
+            heapq.heappush(heap, (score, word))
+            in_heap_words[word] = score
+        elif (score, word) > heap[0]:
+            _, dropped = heapq.heapreplace(heap, (score, word))
+            del in_heap_words[dropped]
+            in_heap_words[word] = score
+
+    missing_words = [word for word in missing_words if word not in scored]
+    return missing_words, {cat: sort_scores((word, score) for score, word
+                                            in heaps[cat])
+                           for cat in heaps}
+
+
+def build_table(filenames, table_dir):
+    """ Merge the scores of every file into a results table in table_dir. The
+    words are laid out by category and then by descending score, so the top of
+    a category is the start of its section. A word scored more than once keeps
+    its highest score, the same as top_scores
+    """
+    merged = {}
+    for word, score in iter_scores(filenames):
+        old = merged.get(word)
+        # a score beats a missing score
+        if old is None or score > old or old != old:
+            merged[word] = score
+
+    words = list(merged)
+    scores = np.fromiter(merged.values(), dtype=np.float64, count=len(words))
+    cats = np.fromiter((CATEGORIES.index(category(word, score))
+                        for word, score in zip(words, scores.tolist())),
+                       dtype=np.int8, count=len(words))
+    order = np.lexsort((-np.nan_to_num(scores), cats))
+
+    os.makedirs(table_dir, exist_ok=True)
+    np.save(os.path.join(table_dir, SCORES_FILE), scores[order])
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    with open(os.path.join(table_dir, WORDS_FILE), 'wb') as f:
+        for i, row in enumerate(order.tolist()):
+            data = words[row].encode('utf8')
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    np.save(os.path.join(table_dir, OFFSETS_FILE), offsets)
+
+    starts = np.searchsorted(cats[order], np.arange(len(CATEGORIES) + 1))
+    with open(os.path.join(table_dir, META_FILE), 'w') as f:
+        json.dump({'n_words': len(words), 'categories': CATEGORIES,
+                   'starts': starts.tolist()}, f)
+    return len(words)
+
+
+def query_table(table_dir, cat, n=10):
+    """ Get the n highest (word, score) pairs of a category out of the table,
+    reading only their rows
+    """
+    with open(os.path.join(table_dir, META_FILE)) as f:
+        meta = json.load(f)
+    i = meta['categories'].index(cat)
+    start = meta['starts'][i]
+    end = min(meta['starts'][i + 1], start + n)
+
+    scores = np.load(os.path.join(table_dir, SCORES_FILE), mmap_mode='r')
+    offsets = np.load(os.path.join(table_dir, OFFSETS_FILE), mmap_mode='r')
+    with open(os.path.join(table_dir, WORDS_FILE), 'rb') as f:
+        f.seek(offsets[start])
+        data = f.read(offsets[end] - offsets[start])
+    ends = (offsets[start + 1:end + 1] - offsets[start]).tolist()
+    words = [data[a:b].decode('utf8') for a, b in
+             zip([0] + ends[:-1], ends)]
+    return list(zip(words, scores[start:end].tolist()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Rank the shock scores of the job outputs")
+    subparsers = parser.add_subparsers(dest='command')
+    top_parser = subparsers.add_parser(
+        'top', help='stream the scores and print the top of each category')
+    top_parser.add_argument('files', nargs='*',
+                            default=['popular-scores.txt'],
+                            help='the word,score files to rank')
+    top_parser.add_argument('-n', type=int, default=10,
+                            help='the number of top scores to keep')
+    table_parser = subparsers.add_parser(
+        'table', help='merge the scores into a results table')
+    table_parser.add_argument('table', help='the directory of the table')
+    table_parser.add_argument('files', nargs='+',
+                              help='the word,score files to merge')
+    query_parser = subparsers.add_parser(
+        'query', help='print the top of the categories of a results table')
+    query_parser.add_argument('table', help='the directory of the table')
+    query_parser.add_argument('-n', type=int, default=10,
+                              help='the number of top scores to print')
+    query_parser.add_argument('--category', choices=CATEGORIES[:-1],
+                              help='only print this category')
+    args = parser.parse_args()
+
+    if args.command == 'table':
+        n_words = build_table(args.files, args.table)
+        print('Merged {} words into {}'.format(n_words, args.table))
+    elif args.command == 'query':
+        for cat in [args.category] if args.category else CATEGORIES[:-1]:
+            print(query_table(args.table, cat, args.n))
+    else:
+        files = args.files if args.command else ['popular-scores.txt']
+        n = args.n if args.command else 10
+        missing_words, top = top_scores(iter_scores(files), n)
+        print(missing_words)
+        print(top['user'])
+        print(top['hashtag'])
+        print(top['word'])
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: rankstore.py
+# author: brendan
+# last modified: 10-19-2026 09:30
+#-------------------------------------------------------------------------------
+"""
+Convert the daily rank files into an on disk day x vocabulary matrix of ranks,
+so the rank data of a word is a column read from a memmap instead of a full
+pass through the tarfile. New days can be appended to the end of the store
+without rebuilding it
+"""
+import os
+import json
+import bisect
+import collections
+import datetime as dt
+import numpy as np
+import argparse
+import rankarchive
+
+RANKS_FILE = 'ranks.int32'
+VOCAB_FILE = 'vocab.txt'
+DATES_FILE = 'dates.txt'
+META_FILE = 'meta.json'
+
+RankStore = collections.namedtuple('RankStore',
+                                   ['ranks', 'words', 'vocab', 'dates',
+                                    'cutoff'])
+
+
+def build_store(tarfile_name, store_dir, years=None, cutoff=100001):
+    """ Convert the tarfile of daily ranks into a rank store in store_dir. Only
+    the days in years are kept if years is given
+    """
+    vocab = {}
+    day_ranks = {}
+    start_date = end_date = None
+    if years is not None:
+        start_date = dt.datetime(min(years), 1, 1)
+        end_date = dt.datetime(max(years), 12, 31)
+
+    for date, ranks in rankarchive.iter_parsed_days(tarfile_name, start_date,
+                                                    end_date):
+        if years is not None and date.year not in years:
+            continue
+        print('{} ...'.format(date))
+        cols = np.empty(len(ranks), dtype=np.int32)
+        vals = np.empty(len(ranks), dtype=np.int32)
+        for i, (word, rank) in enumerate(ranks.items()):
+            try:
+                cols[i] = vocab[word]
+            except KeyError:
+                cols[i] = vocab[word] = len(vocab)
+            vals[i] = rank
+        day_ranks.setdefault(date, []).append((cols, vals))
+
+    dates = sorted(day_ranks)
+    words = sorted(vocab, key=vocab.get)
+
+    os.makedirs(store_dir, exist_ok=True)
+    ranks = np.memmap(os.path.join(store_dir, RANKS_FILE), dtype=np.int32,
+                      mode='w+', shape=(len(dates), len(words)))
+    for row, date in enumerate(dates):
+        ranks[row] = cutoff
+        for cols, vals in day_ranks[date]:
+            # keep the smaller rank if a date shows up in more than one file
+            ranks[row, cols] = np.minimum(ranks[row, cols], vals)
+    ranks.flush()
+    del ranks
+
+    with open(os.path.join(store_dir, VOCAB_FILE), 'w') as f:
+        for word in words:
+            f.write('{}\n'.format(word))
+    with open(os.path.join(store_dir, DATES_FILE), 'w') as f:
+        for date in dates:
+            f.write('{}\n'.format(date.strftime('%Y-%m-%d')))
+    write_meta(store_dir, len(dates), len(words), len(words), cutoff)
+
+
+def write_meta(store_dir, n_days, n_words, capacity, cutoff):
+    """ Write the shape of the store. The ranks file has capacity columns, the
+    ones past n_words are spare columns for words that show up later
+    """
+    meta_file = os.path.join(store_dir, META_FILE)
+    # swap the meta file in, since it is what marks an append as done
+    with open('{}.tmp'.format(meta_file), 'w') as f:
+        json.dump({'shape': [n_days, n_words], 'capacity': capacity,
+                   'cutoff': cutoff}, f)
+    os.replace('{}.tmp'.format(meta_file), meta_file)
+
+
+def grow_capacity(store_dir, n_days, capacity, new_capacity, cutoff,
+                  chunk=1024):
+    """ Rewrite the ranks file with more spare columns, filled with the cutoff
+    """
+    ranks_file = os.path.join(store_dir, RANKS_FILE)
+    old = np.memmap(ranks_file, dtype=np.int32, mode='r',
+                    shape=(n_days, capacity))
+    new = np.memmap(ranks_file + '.tmp', dtype=np.int32, mode='w+',
+                    shape=(n_days, new_capacity))
+    for row in range(0, n_days, chunk):
+        new[row:row + chunk, :capacity] = old[row:row + chunk]
+        new[row:row + chunk, capacity:] = cutoff
+    new.flush()
+    del old, new
+    os.replace(ranks_file + '.tmp', ranks_file)
+
+
+def trim_lines(filename, n_lines):
+    """ Cut a text file down to its first n_lines lines
+    """
+    with open(filename, 'r+b') as f:
+        for _ in range(n_lines):
+            f.readline()
+        f.truncate()
+
+
+def append_days(store_dir, days):
+    """ Append the (date, word to rank dictionary) days that come after the
+    last date of the store to the end of the store. Words the store hasn't
+    seen yet go in the spare columns, and the ranks file is only rewritten
+    when it runs out of them. The meta file is written last, so anything a
+    killed append left past the end of the store is cut off before the next
+    one. Returns the number of days added
+    """
+    store = load_store(store_dir)
+    last_date = store.dates[-1] if store.dates else None
+    vocab = dict(store.vocab)
+    n_days = len(store.dates)
+    n_words = len(store.words)
+    cutoff = store.cutoff
+    with open(os.path.join(store_dir, META_FILE)) as f:
+        capacity = json.load(f).get('capacity', n_words)
+    del store
+
+    # merge the new days, keeping the smaller rank of duplicate dates
+    new_days = {}
+    for date, ranks in days:
+        if last_date is not None and date <= last_date:
+            continue
+        day = new_days.setdefault(date, {})
+        for word, rank in ranks.items():
+            if word not in day or rank < day[word]:
+                day[word] = rank
+    if not new_days:
+        return 0
+
+    # drop the rows, words and dates of an append that never got to write the
+    # meta file, or the new rows would land after them
+    with open(os.path.join(store_dir, RANKS_FILE), 'r+b') as f:
+        f.truncate(n_days * capacity * np.dtype(np.int32).itemsize)
+    trim_lines(os.path.join(store_dir, VOCAB_FILE), n_words)
+    trim_lines(os.path.join(store_dir, DATES_FILE), n_days)
+
+    new_words = []
+    for date in sorted(new_days):
+        for word in new_days[date]:
+            if word not in vocab:
+                vocab[word] = len(vocab)
+                new_words.append(word)
+
+    if len(vocab) > capacity:
+        # leave a quarter more room so the next few updates fit
+        new_capacity = max(len(vocab), capacity + capacity // 4)
+        print('Growing the store to {} words...'.format(new_capacity))
+        grow_capacity(store_dir, n_days, capacity, new_capacity, cutoff)
+        capacity = new_capacity
+
+    with open(os.path.join(store_dir, RANKS_FILE), 'ab') as f:
+        for date in sorted(new_days):
+            print('{} ...'.format(date))
+            row = np.full(capacity, cutoff, dtype=np.int32)
+            for word, rank in new_days[date].items():
+                row[vocab[word]] = rank
+            f.write(row.tobytes())
+
+    with open(os.path.join(store_dir, VOCAB_FILE), 'a') as f:
+        for word in new_words:
+            f.write('{}\n'.format(word))
+    with open(os.path.join(store_dir, DATES_FILE), 'a') as f:
+        for date in sorted(new_days):
+            f.write('{}\n'.format(date.strftime('%Y-%m-%d')))
+    write_meta(store_dir, n_days + len(new_days), len(vocab), capacity,
+               cutoff)
+    return len(new_days)
+
+
+def load_store(store_dir, mode='r'):
+    """ Load the rank store in store_dir, with the ranks opened as a memmap
+    """
+    with open(os.path.join(store_dir, META_FILE)) as f:
+        meta = json.load(f)
+    n_days, n_words = meta['shape']
+    capacity = meta.get('capacity', n_words)
+    # only the part of the files counted by the meta file is in the store
+    with open(os.path.join(store_dir, VOCAB_FILE)) as f:
+        words = f.read().split('\n')[:n_words]
+    with open(os.path.join(store_dir, DATES_FILE)) as f:
+        dates = [dt.datetime.strptime(line.strip(), '%Y-%m-%d')
+                 for line in f.read().split('\n')[:n_days]]
+    ranks = np.memmap(os.path.join(store_dir, RANKS_FILE), dtype=np.int32,
+                      mode=mode, shape=(n_days, capacity))[:, :n_words]
+    vocab = {word: i for i, word in enumerate(words)}
+    return RankStore(ranks, words, vocab, dates, meta['cutoff'])
+
+
+def word_column(store, word):
+    """ Get the ranks of a word for every date in the store. Words that never
+    made the daily ranks get the cutoff for every day
+    """
+    try:
+        return np.array(store.ranks[:, store.vocab[word]])
+    except KeyError:
+        return np.full(len(store.dates), store.cutoff, dtype=np.int32)
+
+
+def word_block(store, words, start=0):
+    """ Get the days x words block of ranks for a list of words, reading every
+    column in one go. Only the days from row start on are read
+    """
+    block = np.full((len(store.dates) - start, len(words)), store.cutoff,
+                    dtype=np.int32)
+    found = [i for i, word in enumerate(words) if word in store.vocab]
+    cols = [store.vocab[words[i]] for i in found]
+    if cols:
+        block[:, found] = store.ranks[start:, cols]
+    return block
+
+
+def word_series(store, word, year):
+    """ Get the (date, rank) data for a word in the year and the year before,
+    in the same form as get_full_data
+    """
+    column = word_column(store, word)
+    return [(date, int(rank)) for date, rank in zip(store.dates, column)
+            if date.year == year or date.year == year - 1]
+
+
+def date_window(store, start_date, end_date):
+    """ Get the dense words x dates window of ranks between the dates out of
+    the store, with only the words that made the ranks on those dates, in the
+    same form as rankarchive.get_rank_window
+    """
+    first = bisect.bisect_left(store.dates, start_date)
+    last = bisect.bisect_right(store.dates, end_date)
+    block = np.array(store.ranks[first:last])
+    cols = np.flatnonzero((block < store.cutoff).any(axis=0))
+    words = [store.words[col] for col in cols]
+    vocab = {word: i for i, word in enumerate(words)}
+    return rankarchive.RankWindow(words, vocab, store.dates[first:last],
+                                  np.ascontiguousarray(block[:, cols].T))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Convert the daily rank tarfile into a rank store")
+    parser.add_argument('tarfile', help='the tarfile of daily ranks')
+    parser.add_argument('store', help='the directory to write the store to')
+    parser.add_argument('years', nargs='*', type=int,
+                        help='only keep the days in these years')
+    args = parser.parse_args()
+
+    build_store(args.tarfile, args.store, set(args.years) or None)
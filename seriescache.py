@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: seriescache.py
+# author: brendan
+# last modified: 10-18-2026 19:10
+#-------------------------------------------------------------------------------
+"""
+Cache the (date, rank) data of a word in a year as a small packed file of
+int32 day ordinals and ranks, in place of the data/*.pkl pickles. Every file
+has a version and a fingerprint of the tarfile it was read from, so a stale
+entry is read again instead of used, and the cache directory is kept under a
+size limit by dropping the least recently used entries
+"""
+import os
+import re
+import glob
+import struct
+import pickle
+import hashlib
+import urllib.parse
+import datetime as dt
+import numpy as np
+import argparse
+from rankarchive import get_full_data
+
+CACHE_DIR = 'data'
+VERSION = 1
+MAGIC = b'RSER'
+# magic, version, fingerprint, cutoff and the number of days
+HEADER = struct.Struct('<4sH2x16sII')
+# the fingerprint of entries that don't know their tarfile, which are only
+# used when there isn't a tarfile to read them again from
+NO_FINGERPRINT = bytes(16)
+MAX_BYTES = 256 * 1024 ** 2
+# the day ordinal of the numpy datetime64 epoch
+EPOCH = dt.date(1970, 1, 1).toordinal()
+
+
+def archive_fingerprint(tarfile_name):
+    """ Fingerprint the tarfile by its size and modified time, or None if the
+    tarfile isn't there
+    """
+    try:
+        stat = os.stat(tarfile_name)
+    except FileNotFoundError:
+        return None
+    return hashlib.md5('{}:{}'.format(stat.st_size, stat.st_mtime_ns)
+                       .encode()).digest()
+
+
+def cache_name(word, year, cache_dir=CACHE_DIR):
+    """ The name of the cache file of the word in the year
+    """
+    return os.path.join(cache_dir, '{}-{}.series'.format(
+        urllib.parse.quote(word, safe="@#'"), year))
+
+
+def save_series(full_data, word, year, fingerprint=None, cutoff=100001,
+                cache_dir=CACHE_DIR):
+    """ Save the (date, rank) data of the word in the year to the cache
+    """
+    days = np.array([date.toordinal() for date, _ in full_data],
+                    dtype=np.int32)
+    ranks = np.array([rank for _, rank in full_data], dtype=np.int32)
+    header = HEADER.pack(MAGIC, VERSION, fingerprint or NO_FINGERPRINT,
+                         cutoff, len(days))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    filename = cache_name(word, year, cache_dir)
+    with open('{}.tmp'.format(filename), 'wb') as f:
+        f.write(header + days.tobytes() + ranks.tobytes())
+    os.replace('{}.tmp'.format(filename), filename)
+
+
+def load_arrays(word, year, fingerprint=None, cutoff=100001,
+                cache_dir=CACHE_DIR):
+    """ Load the day ordinals and ranks of the word in the year from the
+    cache. Returns None if there is no entry, or if it is from another version,
+    another tarfile or another cutoff. Entries without a fingerprint, like the
+    converted pickles, are stale whenever the fingerprint of a tarfile is given
+    """
+    filename = cache_name(word, year, cache_dir)
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < HEADER.size:
+        print('{} is truncated, reading it again'.format(filename))
+        return None
+    magic, version, entry_print, entry_cutoff, n_days = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or \
+            len(data) != HEADER.size + 8 * n_days:
+        print('{} is not a version {} entry, reading it again'.format(
+            filename, VERSION))
+        return None
+    if entry_cutoff != cutoff:
+        return None
+    if fingerprint is not None and entry_print != fingerprint:
+        print('{} is from another tarfile, reading it again'.format(filename))
+        return None
+
+    # mark the entry as used for the eviction
+    os.utime(filename)
+    arrays = np.frombuffer(data, dtype=np.int32, offset=HEADER.size)
+    return arrays[:n_days], arrays[n_days:]
+
+
+def load_series(word, year, fingerprint=None, cutoff=100001,
+                cache_dir=CACHE_DIR):
+    """ Load the (date, rank) data of the word in the year from the cache, in
+    the same form as get_full_data. Returns None on a miss
+    """
+    arrays = load_arrays(word, year, fingerprint, cutoff, cache_dir)
+    if arrays is None:
+        return None
+    days, ranks = arrays
+    # numpy turns the days into datetimes far faster than fromordinal
+    dates = (days - EPOCH).astype('datetime64[D]').astype('datetime64[us]')
+    return list(zip(dates.tolist(), ranks.tolist()))
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    """ Remove the least recently used entries until the cache fits in
+    max_bytes. Returns the number of entries removed
+    """
+    entries = []
+    for filename in glob.glob(os.path.join(cache_dir, '*.series')):
+        stat = os.stat(filename)
+        entries.append((stat.st_mtime_ns, stat.st_size, filename))
+    total = sum(size for _, size, _ in entries)
+
+    n_removed = 0
+    for _, size, filename in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(filename)
+        total -= size
+        n_removed += 1
+    return n_removed
+
+
+def load_many(words, year, tarfile_name, cutoff=100001, cache_dir=CACHE_DIR,
+              max_bytes=MAX_BYTES):
+    """ Load the (date, rank) data of every word in the year, reading all of
+    the words missing from the cache out of the tarfile in a single pass and
+    caching them
+    """
+    fingerprint = archive_fingerprint(tarfile_name)
+    full_data = {}
+    for word in words:
+        series = load_series(word, year, fingerprint, cutoff, cache_dir)
+        if series is not None:
+            full_data[word] = series
+
+    missing = [word for word in words if word not in full_data]
+    if missing:
+        read = get_full_data(missing, tarfile_name, year, cutoff)
+        for word in missing:
+            save_series(read[word], word, year, fingerprint, cutoff,
+                        cache_dir)
+        full_data.update(read)
+        evict(cache_dir, max_bytes)
+    return full_data
+
+
+def load_full_data(word, year, tarfile_name, cutoff=100001,
+                   cache_dir=CACHE_DIR):
+    """ Load the (date, rank) data of the word in the year from the cache, or
+    read it from the tarfile and cache it if it isn't there
+    """
+    return load_many([word], year, tarfile_name, cutoff, cache_dir)[word]
+
+
+def convert_pickles(cache_dir=CACHE_DIR, remove=False):
+    """ Convert the old <word>-<year>-full-data.pkl files in the cache
+    directory into cache entries. The pickles don't know which tarfile they
+    came from, and were gathered with the old substring matching, so the
+    entries are saved without a fingerprint and are read again as soon as the
+    tarfile is there
+    """
+    n_converted = 0
+    for filename in sorted(glob.glob(os.path.join(cache_dir, '*.pkl'))):
+        match = re.match(r'(.*)-(\d{4})-full-data\.pkl$',
+                         os.path.basename(filename))
+        if match is None:
+            continue
+        word, year = match.group(1), int(match.group(2))
+        with open(filename, 'rb') as f:
+            full_data = pickle.load(f, encoding='bytes')
+        save_series(full_data, word, year, cache_dir=cache_dir)
+        if remove:
+            os.remove(filename)
+        n_converted += 1
+    return n_converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Manage the cache of word rank series")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser(
+        'convert', help='convert the old pickles into cache entries')
+    convert_parser.add_argument('--cache', default=CACHE_DIR,
+                                help='the cache directory')
+    convert_parser.add_argument('--remove', action='store_true',
+                                help='remove the pickles once converted')
+    evict_parser = subparsers.add_parser(
+        'evict', help='drop the least recently used entries')
+    evict_parser.add_argument('max_mb', type=float,
+                              help='the size to bring the cache down to')
+    evict_parser.add_argument('--cache', default=CACHE_DIR,
+                              help='the cache directory')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        print('Converted {} pickles'.format(convert_pickles(args.cache,
+                                                            args.remove)))
+    else:
+        n_removed = evict(args.cache, int(args.max_mb * 1024 ** 2))
+        print('Removed {} entries'.format(n_removed))
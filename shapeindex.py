@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: shapeindex.py
+# author: brendan
+# last modified: 10-19-2026 10:20
+#-------------------------------------------------------------------------------
+"""
+Index the shape of every word's ranks in each month of the year, so the words
+that moved like a shocking word can be found without comparing against the
+whole vocabulary. Each month of each word is z-normalized and summarized by
+the means of a few segments (PAA). The distance between the summaries is a
+lower bound on the true distance, so most words are ruled out before reading
+their ranks
+"""
+import os
+import numpy as np
+import argparse
+import rankstore
+
+INDEX_FILE = 'shape-{}.npz'
+
+
+def znorm(block):
+    """ z-normalize every column of a days x words block. Columns that never
+    change are left at 0
+    """
+    block = np.asarray(block, dtype=np.float64)
+    std = block.std(axis=0)
+    std[std == 0] = 1
+    return (block - block.mean(axis=0)) / std
+
+
+def paa(block, segments):
+    """ Summarize every column of a days x words block by the mean of each of
+    its segments. Returns the summaries and the length of each segment
+    """
+    pieces = np.array_split(np.arange(block.shape[0]), segments)
+    lengths = np.array([len(piece) for piece in pieces])
+    starts = np.array([piece[0] for piece in pieces])
+    sums = np.add.reduceat(block, starts, axis=0)
+    return (sums / lengths[:, np.newaxis]).T, lengths
+
+
+def month_rows(store, year, month):
+    """ Find the rows of the store in the month of the year
+    """
+    rows = [i for i, date in enumerate(store.dates)
+            if date.year == year and date.month == month]
+    if not rows:
+        return None
+    return rows[0], rows[-1] + 1
+
+
+def build_index(store_dir, year, segments=6, chunk=65536):
+    """ Build the monthly shape index of every word in the store for the year
+    """
+    store = rankstore.load_store(store_dir)
+    arrays = {}
+    for month in range(1, 13):
+        rows = month_rows(store, year, month)
+        if rows is None or rows[1] - rows[0] < segments:
+            continue
+        print('{}-{:02d} ...'.format(year, month))
+        summaries = np.empty((len(store.words), segments), dtype=np.float32)
+        for col in range(0, len(store.words), chunk):
+            block = znorm(store.ranks[rows[0]:rows[1], col:col + chunk])
+            summaries[col:col + chunk], lengths = paa(block, segments)
+        arrays['paa_{:02d}'.format(month)] = summaries
+        arrays['lengths_{:02d}'.format(month)] = lengths
+
+    # the size of the store the index was built from, to tell when it is out
+    # of date
+    arrays['n_days'] = len(store.dates)
+    arrays['n_words'] = len(store.words)
+    index_file = os.path.join(store_dir, INDEX_FILE.format(year))
+    np.savez(index_file, **arrays)
+    return index_file
+
+
+def check_index(store, index, year):
+    """ Make sure the index was built from the store as it is now. The index
+    has to be built again once days or words are appended to the store
+    """
+    if 'n_days' not in index or index['n_days'] != len(store.dates) or \
+            index['n_words'] != len(store.words):
+        raise ValueError('The {} shape index is out of date with the store, '
+                         'it needs to be built again'.format(year))
+
+
+def load_index(store_dir, year, store=None):
+    """ Load the monthly shape index of the year
+    """
+    if store is None:
+        store = rankstore.load_store(store_dir)
+    index = np.load(os.path.join(store_dir, INDEX_FILE.format(year)))
+    check_index(store, index, year)
+    return index
+
+
+def query(store, index, word, year, month, n=10, batch=256):
+    """ Find the n words whose ranks in the month are closest in shape to the
+    word's. The candidates are checked in order of their lower bound, and the
+    search stops once the lower bound passes the nth best distance. Returns
+    the (distance, word) pairs and the number of exact distances worked out
+    """
+    check_index(store, index, year)
+    rows = month_rows(store, year, month)
+    if rows is None:
+        raise ValueError('The store has no days in {}-{:02d}'.format(year,
+                                                                     month))
+    # months with fewer days than segments are left out of the index
+    if 'paa_{:02d}'.format(month) not in index:
+        raise ValueError('The {} shape index has no {}-{:02d}'.format(
+            year, year, month))
+    summaries = index['paa_{:02d}'.format(month)]
+    lengths = index['lengths_{:02d}'.format(month)]
+
+    target = znorm(rankstore.word_column(store, word)[rows[0]:rows[1], None])
+    target_summary, _ = paa(target, len(lengths))
+    lower_bound = np.sqrt(((summaries - target_summary) ** 2 * lengths)
+                          .sum(axis=1))
+    if word in store.vocab:
+        lower_bound[store.vocab[word]] = np.inf
+    order = np.argsort(lower_bound)
+
+    best = np.empty(0)
+    best_cols = np.empty(0, dtype=np.int64)
+    checked = 0
+    for i in range(0, len(order), batch):
+        cols = order[i:i + batch]
+        if best.size == n and lower_bound[cols[0]] > best[-1]:
+            break
+        cols = cols[np.isfinite(lower_bound[cols])]
+        block = znorm(store.ranks[rows[0]:rows[1], np.sort(cols)])
+        dist = np.sqrt(((block - target) ** 2).sum(axis=0))
+        checked += len(cols)
+
+        best = np.concatenate([best, dist])
+        best_cols = np.concatenate([best_cols, np.sort(cols)])
+        keep = np.argsort(best, kind='stable')[:n]
+        best = best[keep]
+        best_cols = best_cols[keep]
+
+    return [(dist, store.words[col]) for dist, col in
+            zip(best.tolist(), best_cols)], checked
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Build or query the monthly shape index of a rank store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='build the index')
+    build_parser.add_argument('store', help='the rank store')
+    build_parser.add_argument('year', type=int, help='the year to index')
+    build_parser.add_argument('--segments', type=int, default=6,
+                              help='the number of PAA segments per month')
+    query_parser = subparsers.add_parser(
+        'query', help='find the words that moved like a word in a month')
+    query_parser.add_argument('store', help='the rank store')
+    query_parser.add_argument('year', type=int, help='the year to look in')
+    query_parser.add_argument('word', help='the word to compare against')
+    query_parser.add_argument('month', type=int, help='the month to look in')
+    query_parser.add_argument('n', nargs='?', type=int, default=10,
+                              help='the number of words to find')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index(args.store, args.year, args.segments)
+    else:
+        store = rankstore.load_store(args.store)
+        index = load_index(args.store, args.year, store)
+        words, checked = query(store, index, args.word, args.year,
+                               args.month, args.n)
+        print(words)
+        print('Checked {} of {} words'.format(checked, len(store.words)))
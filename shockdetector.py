@@ -4,157 +4,108 @@
 # created on: 11-14-2018
 # filename: shockdetector.py
 # author: brendan
-# last modified: 12-06-2018 20:57
+# last modified: 10-19-2026 10:45
 #-------------------------------------------------------------------------------
 """
 Detect the shocking words, and caclulate their scores. To be executable on the
 VACC
 """
-import tarfile
-import numpy as np
-import dateutil.relativedelta as rdelta
-import datetime as dt
 import argparse
-
-
-def calc_prev_median(date, data, k=1.5):
-    """ Calculate the median for a certain date from the data of the previous
-    six months of data.
-    """
-    earliest_date = date - rdelta.relativedelta(months=6)
-    # keep only the data in this range
-    my_data = []
-    for check_date, rank in data:
-        if check_date >= earliest_date and check_date <= date:
-            my_data.append(rank)
-    
-    median = np.median(my_data)
-    first_quart = np.percentile(my_data, 25)
-    third_quart = np.percentile(my_data, 75)
-    IQR = third_quart - first_quart
-
-    lower_bound = first_quart - k * IQR
-    # make sure the lower bound doesn't go below 1
-    lower_bound = lower_bound if lower_bound > 1 else 1
-    upper_bound = third_quart + k * IQR
-
-    return (date, median, lower_bound, upper_bound)
+import os
+import rankstore
+import jobstats
+from rankarchive import get_full_data
+from baseline import year_bounds, block_bounds
+from shockevents import find_events, max_shock
 
 
 def calc_max_shock(rank, l_bound):
     """ Calculate the max shock score given the rank of the word and the lower
     bound on those scores
     """
-    rank_arr = np.array(rank)
-    lbound_arr = np.array(l_bound)
-    z = rank_arr - lbound_arr
-    shock_ix = (z < 0).nonzero()[0]
+    events = find_events(rank, l_bound)
     # if there is no shock return 0
-    if shock_ix.size == 0:
+    if events.area.size == 0:
         return 0
-    # we know that the lines will cross again before the min shock_ix and max
-    # shock_ix, so we need to account for that
-    # add the index before and after the shock event
-    new_ixs = []
-    events = []
-    event = 0
-    for ix in shock_ix:
-        # if the previous index is not there start a new event
-        if (shock_ix != ix - 1).all():
-            new_ixs.append(ix - 1)
-            events.append(event)
-        new_ixs.append(ix)
-        events.append(event)
-        if (shock_ix != ix + 1).all():
-            new_ixs.append(ix + 1)
-            events.append(event)
-            event += 1
-
-    # create an empty array to keep track of event sizes, where index is event
-    # number and the value is the event size
-    event_sizes = np.empty(max(events)+1)
-    shock_ix = np.array(new_ixs)
-    events = np.array(events)
-    # loop through unique events to calculate trapezoidal area
-    for event in range(min(events), max(events) + 1):
-        # first shrink z to the event
-        this_event = (events == event)
-        # boil down indices to just event
-        event_ix = np.where(this_event, shock_ix, 0)
-        # remove zeros, from event index
-        event_ix = event_ix[event_ix != 0]
-        event_z = z[event_ix]
-        
-        # find the area of the first and last triangles of the event
-        first_intersect = - 1 / (event_z[1] - event_z[0]) * event_z[0]
-        last_intersect = - 1 / (event_z[-1] - event_z[-2]) * event_z[-2]
-        
-        area = 0.5 * (1 - first_intersect) * abs(event_z[1])
-        area += 0.5 * last_intersect * abs(event_z[-2])
-        
-        # find the area of the middle if it exists
-        if len(event_ix) > 3:
-            middle = event_z[1:-1]
-            middle_areas = abs(middle[:-1] + middle[1:]) * 0.5
-            area += middle_areas.sum()
-
-        event_sizes[event] = area
-    
-    return max(event_sizes)
+    return events.area.max()
+
+
+def calc_word_shock(full_data, year):
+    """ Calculate the max shock of a word from its full (date, rank) data
+    """
+    with jobstats.stage('baseline'):
+        _, rank, bounds = year_bounds(full_data, year)
+
+    with jobstats.stage('events'):
+        max_shock = calc_max_shock(rank, bounds.lower)
+    return max_shock
+
+
+def calc_store_shocks(store, words, year):
+    """ Calculate the max shock of every word straight from the rank store,
+    working out the baselines of all the words at once
+    """
+    # keep the year and the year before for the baseline windows
+    rows = [i for i, date in enumerate(store.dates)
+            if date.year == year or date.year == year - 1]
+    dates = [store.dates[i] for i in rows]
+    years = [date.year for date in dates]
+    if year not in years:
+        raise ValueError('The rank store has no days in {}'.format(year))
+    with jobstats.stage('store_read'):
+        block = rankstore.word_block(store, words)[rows]
+    start = years.index(year)
+
+    with jobstats.stage('baseline'):
+        bounds = block_bounds(dates, block, start=start)
+    with jobstats.stage('events'):
+        events = find_events(block[start:], bounds.lower)
+        shocks = max_shock(events, len(words))
+    # words without a shock get a score of 0, same as calc_max_shock
+    return [shock if shock > 0 else 0 for shock in shocks.tolist()]
 
 
 def get_max_shock(word):
     """Run the program with the word and year specified
     """
     print('Gathering Data...')
-    full_data = []
-    with tarfile.open(TARFILE, mode='r:gz') as f:
-        for member in f:
-            if member.isfile():
-                # parse the date from the file name
-                date_str = member.name.split('.')[0][-10:]
-                try:
-                    date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                except ValueError:
-                    continue
-                
-                if date.year == YEAR or date.year == YEAR - 1:
-                    # flag to record if the word was found in the file
-                    found = False
-                    for line in f.extractfile(member):
-                        if word in line.decode():
-                            rank = int(line.decode().split()[-1])
-                            full_data.append((date, rank))
-                            found = True
-                            break
-                    # if the word isn't found give it the max rank
-                    if not found:
-                        rank = CUTOFF
-                        full_data.append((date, rank))
-
-    full_data = sorted(full_data)
-    year_data = [(date, data) for date, data in full_data if date.year == YEAR]
-    
-    print('Calculating Shock...')
-    median_data = []
-    for date, _ in year_data:
-        median_data.append(calc_prev_median(date, full_data))
+    if os.path.isdir(STORE):
+        store = rankstore.load_store(STORE)
+        full_data = rankstore.word_series(store, word, YEAR)
+    else:
+        full_data = get_full_data([word], TARFILE, YEAR, CUTOFF)[word]
 
-    _, _, l_bound, _ = zip(*median_data)
-    _, rank = zip(*year_data)
-
-    max_shock = calc_max_shock(rank, l_bound)
-    return max_shock
+    print('Calculating Shock...')
+    return calc_word_shock(full_data, YEAR)
 
 
 def main():
     """Run the code to calculate the max shock for each word and then save the
     outputs to a new file
     """
-    with open('{}/{}.txt'.format(CWD, JOBID), 'w') as sfile:
+    print('Gathering Data...')
+    if os.path.isdir(STORE):
+        # read every word's column straight out of the rank store and work
+        # out all of the baselines together
+        store = rankstore.load_store(STORE)
+        print('Calculating Shock...')
+        shock_vals = calc_store_shocks(store, WORDS, YEAR)
+    else:
+        # gather every word in one pass over the tarfile
+        with jobstats.stage('read'):
+            word_data = get_full_data(WORDS, TARFILE, YEAR, CUTOFF)
+        print('Calculating Shock...')
+        shock_vals = []
         for word in WORDS:
-            shock_val = get_max_shock(word)
+            with jobstats.stage('word', word):
+                shock_vals.append(calc_word_shock(word_data[word], YEAR))
+
+    outfile = '{}/{}.txt'.format(CWD, JOBID)
+    with open(outfile, 'w') as sfile:
+        for word, shock_val in zip(WORDS, shock_vals):
             sfile.write('{},{}\n'.format(word, shock_val))
+    if jobstats.enabled():
+        jobstats.write_sidecar(outfile, JOBID)
 
 
 if __name__ == '__main__':
@@ -168,17 +119,25 @@ if __name__ == '__main__':
     parser.add_argument('JOBID', help='job id for the VACC')
     parser.add_argument('words', nargs='?',
                         help='the words to shock detect')
-    parser.add_argument('year', nargs='?', default=2018,
+    parser.add_argument('year', nargs='?', default=2018, type=int,
                         help='the year of concern for the plot')
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to read from, relative to CWD')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the time and memory of each stage to a '
+                        'JOBID.stats.json sidecar')
     args = parser.parse_args()
     
     # global variables defined
     CWD = args.CWD
     TARFILE = '{}/top_daily_words_uni.tar_.gz'.format(CWD)
+    STORE = os.path.join(CWD, args.store)
     JOBID = args.JOBID
     WORDS = args.words.split(',')
     YEAR = args.year
     # max rank of table
     CUTOFF = 100001
 
+    if args.profile:
+        jobstats.enable()
     main()
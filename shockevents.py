@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: shockevents.py
+# author: brendan
+# last modified: 10-18-2026 11:45
+#-------------------------------------------------------------------------------
+"""
+Find the shock events, the runs of days where the rank rises above the lower
+bound of the baseline, and calculate their size as the trapezoidal area between
+the two lines. Works on a single word or a days x words block at once
+"""
+import collections
+import numpy as np
+
+Events = collections.namedtuple('Events', ['column', 'start', 'end', 'area',
+                                           'depth'])
+
+
+def find_events(rank, l_bound):
+    """ Find every shock event of the ranks against the lower bound. rank and
+    l_bound are either a series of days or a days x words block. Returns the
+    events as arrays of the column, the first and last day of the event, the
+    area of the event and its peak depth below the bound
+    """
+    z = np.asarray(rank, dtype=np.float64) - np.asarray(l_bound,
+                                                        dtype=np.float64)
+    if z.ndim == 1:
+        z = z[:, np.newaxis]
+    n_days, n_cols = z.shape
+    # lay the days out along the rows, so the events come out sorted by column
+    # and then by day
+    z = np.ascontiguousarray(z.T)
+
+    # the shock runs start where the padded mask steps up and end where it
+    # steps down
+    shock = np.zeros((n_cols, n_days + 2), dtype=np.int8)
+    shock[:, 1:-1] = z < 0
+    steps = np.diff(shock, axis=1)
+    column, start = np.nonzero(steps == 1)
+    _, end = np.nonzero(steps == -1)
+    end -= 1
+
+    if column.size == 0:
+        empty = np.empty(0)
+        return Events(column, start, end, empty, empty)
+
+    z_start = z[column, start]
+    z_end = z[column, end]
+
+    # the area of the trapezoids between the days of the event
+    cum_z = np.zeros((n_cols, n_days + 1))
+    np.cumsum(z, axis=1, out=cum_z[:, 1:])
+    total = cum_z[column, end + 1] - cum_z[column, start]
+    area = -(total - 0.5 * (z_start + z_end))
+
+    # add the triangle from where the lines cross before the first day, unless
+    # the event runs off the start of the data
+    ix = start > 0
+    prev_z = z[column[ix], start[ix] - 1]
+    first_intersect = prev_z / (prev_z - z_start[ix])
+    area[ix] += 0.5 * (1 - first_intersect) * -z_start[ix]
+
+    # and the triangle out to where they cross after the last day
+    ix = end < n_days - 1
+    next_z = z[column[ix], end[ix] + 1]
+    last_intersect = -z_end[ix] / (next_z - z_end[ix])
+    area[ix] += 0.5 * last_intersect * -z_end[ix]
+
+    # the peak depth is the min of z over each event, so reduce over the
+    # [start, end] slices of the flattened z and skip the gaps in between
+    flat_z = np.append(z.ravel(), 0)
+    slices = np.empty(2 * column.size, dtype=np.int64)
+    slices[0::2] = column * n_days + start
+    slices[1::2] = column * n_days + end + 1
+    depth = -np.minimum.reduceat(flat_z, slices)[0::2]
+
+    return Events(column, start, end, area, depth)
+
+
+def max_shock(events, n_cols):
+    """ Get the max shock of every column, where columns without any events
+    have a shock of 0
+    """
+    shocks = np.zeros(n_cols)
+    np.maximum.at(shocks, events.column, events.area)
+    return shocks
+
+
+def top_events(events, n):
+    """ Get the indices of the n largest events, largest first
+    """
+    if events.area.size > n:
+        top = np.argpartition(-events.area, n)[:n]
+    else:
+        top = np.arange(events.area.size)
+    return top[np.argsort(-events.area[top], kind='stable')]
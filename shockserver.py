@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: shockserver.py
+# author: brendan
+# last modified: 10-19-2026 11:00
+#-------------------------------------------------------------------------------
+"""
+Serve the word series, baselines, shock scores, shock events, similar words
+and plots of the rank store over HTTP on the local machine, so each question
+doesn't have to start a new interpreter and read the data again. The shock
+scores asked for at the same time are worked out together in one block. The
+queries are answered as JSON, e.g.
+
+    curl 'localhost:8017/shock?word=mac&year=2018'
+"""
+import matplotlib
+matplotlib.use('Agg')
+import io
+import json
+import bisect
+import time
+import threading
+import datetime as dt
+import urllib.parse
+import urllib.request
+import http.server
+import numpy as np
+import argparse
+import rankstore
+import rankarchive
+import wordmemo
+from shockdetector import calc_store_shocks
+from extractstory import calc_max_shock_ix, test_rank
+from makewordplot import baseline_plot
+
+PORT = 8017
+# how long the first shock query waits for others to batch with it
+BATCH_WAIT = 0.005
+
+_SOURCE = {'store': None, 'store_dir': None,
+           'tarfile': 'top_daily_words_uni.tar_.gz', 'cutoff': 100001}
+_PENDING = []
+_PENDING_LOCK = threading.Lock()
+_PLOT_LOCK = threading.Lock()
+
+
+def open_source(store_dir, tarfile_name, cutoff=100001):
+    """ Open the rank store once for every query, falling back on the series
+    cache of the tarfile if there isn't a store
+    """
+    try:
+        _SOURCE['store'] = wordmemo.open_store(store_dir)[0]
+        _SOURCE['store_dir'] = store_dir
+    except FileNotFoundError:
+        _SOURCE['store'] = None
+        _SOURCE['store_dir'] = None
+    _SOURCE['tarfile'] = tarfile_name
+    _SOURCE['cutoff'] = cutoff
+
+
+def source_store():
+    """ The rank store and its number of days, opened again by the memo if
+    days have been appended since the last query
+    """
+    store, n_days = wordmemo.open_store(_SOURCE['store_dir'])
+    _SOURCE['store'] = store
+    return store, n_days
+
+
+def check_year(year):
+    """ Raise a LookupError if the rank store has no days in the year
+    """
+    if _SOURCE['store'] is None:
+        return
+    store, _ = source_store()
+    row = bisect.bisect_left(store.dates, dt.datetime(year, 1, 1))
+    if row == len(store.dates) or store.dates[row].year != year:
+        raise LookupError('The rank store has no days in {}'.format(year))
+
+
+def word_series(word, year):
+    """ Get the (date, rank) data of the word in the year and the year before
+    out of the memo. Raises a LookupError if there are no days in the year
+    """
+    series = wordmemo.word_series(word, year, _SOURCE['tarfile'],
+                                  _SOURCE['cutoff'], _SOURCE['store_dir'])
+    if not any(date.year == year for date, _ in series):
+        raise LookupError('There are no days of {} in {}'.format(word, year))
+    return series
+
+
+def word_bounds(word, year, k=1.5):
+    """ Get the dates, ranks and bounds of the word out of the memo
+    """
+    word_series(word, year)
+    return wordmemo.word_bounds(word, year, _SOURCE['tarfile'],
+                                _SOURCE['cutoff'], _SOURCE['store_dir'], k)
+
+
+def score_batch(batch):
+    """ Work out the shock scores of a batch of queued queries, a block of
+    words for each year, and wake up the threads waiting on them. A year that
+    fails only fails the queries for that year
+    """
+    years = {}
+    for request in batch:
+        years.setdefault(request['year'], []).append(request)
+    for year, requests in years.items():
+        try:
+            store, _ = source_store()
+            words = sorted(set(request['word'] for request in requests))
+            scores = dict(zip(words, calc_store_shocks(store, words, year)))
+            for request in requests:
+                request['shock'] = scores[request['word']]
+        except Exception as error:
+            for request in requests:
+                request['error'] = error
+        finally:
+            for request in requests:
+                request['done'].set()
+
+
+def batched_shocks(words, year):
+    """ Queue the shock queries of the words together. The query that finds
+    the queue empty waits a moment for others to arrive and then scores the
+    whole queue at once
+    """
+    requests = [{'word': word, 'year': year, 'done': threading.Event(),
+                 'shock': None, 'error': None} for word in words]
+    with _PENDING_LOCK:
+        leader = not _PENDING
+        _PENDING.extend(requests)
+    if leader:
+        time.sleep(BATCH_WAIT)
+        with _PENDING_LOCK:
+            batch = _PENDING[:]
+            del _PENDING[:]
+        score_batch(batch)
+    for request in requests:
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+    return [request['shock'] for request in requests]
+
+
+def max_shocks(words, year):
+    """ Get the max shock of each of the words, batched with the other
+    queries if there is a store
+    """
+    if _SOURCE['store'] is not None:
+        return batched_shocks(words, year)
+    shocks = []
+    for word in words:
+        word_series(word, year)
+        events = wordmemo.word_events(word, year, _SOURCE['tarfile'],
+                                      _SOURCE['cutoff'])
+        shocks.append(events.area.max().item() if events.area.size else 0)
+    return shocks
+
+
+def shock_window(word, year):
+    """ Get the window of ranks around the largest shock of the word, the
+    same way as extractstory
+    """
+    date, rank, bounds = word_bounds(word, year)
+    shock_ix = calc_max_shock_ix(rank, bounds.lower)
+    if np.isscalar(shock_ix):
+        return None
+    start_date = date[shock_ix[0]]
+    end_date = date[max(shock_ix[-1] - 1, shock_ix[0])]
+    if _SOURCE['store'] is not None:
+        store, n_days = source_store()
+        return wordmemo.memo(('window', _SOURCE['store_dir'], n_days,
+                              start_date, end_date),
+                             lambda: rankstore.date_window(
+                                 store, start_date, end_date))
+    dates = [start_date + dt.timedelta(n)
+             for n in range((end_date - start_date).days + 1)]
+    return wordmemo.memo(('window', _SOURCE['tarfile'], start_date, end_date,
+                          _SOURCE['cutoff']),
+                         lambda: rankarchive.get_rank_window(
+                             _SOURCE['tarfile'], dates, _SOURCE['cutoff']))
+
+
+def day_strings(dates):
+    """ Format the dates for the JSON answers
+    """
+    return [date.strftime('%Y-%m-%d') for date in dates]
+
+
+def query_series(word, year):
+    """ The ranks of the word on every day of the year and the year before
+    """
+    series = word_series(word, year)
+    return {'word': word, 'year': year,
+            'dates': day_strings(date for date, _ in series),
+            'ranks': [rank for _, rank in series]}
+
+
+def query_baseline(word, year, k=1.5):
+    """ The ranks of the word in the year along with its rolling baseline
+    """
+    date, rank, bounds = word_bounds(word, year, k)
+    answer = {'word': word, 'year': year, 'dates': day_strings(date),
+              'ranks': rank.tolist()}
+    for field in ['median', 'lower', 'upper']:
+        answer[field] = getattr(bounds, field).tolist()
+    return answer
+
+
+def query_shock(words, year):
+    """ The max shock of each of the words
+    """
+    return {'year': year,
+            'shocks': dict(zip(words, max_shocks(words, year)))}
+
+
+def query_events(word, year, k=1.5):
+    """ Every shock event of the word in the year, largest first
+    """
+    date, _, _ = word_bounds(word, year, k)
+    events = wordmemo.word_events(word, year, _SOURCE['tarfile'],
+                                  _SOURCE['cutoff'], _SOURCE['store_dir'], k)
+    order = np.argsort(-events.area)
+    return {'word': word, 'year': year, 'events': [
+        {'start': day_strings([date[events.start[i]]])[0],
+         'end': day_strings([date[events.end[i]]])[0],
+         'area': events.area[i].item(), 'depth': events.depth[i].item()}
+        for i in order.tolist()]}
+
+
+def query_similar(word, year, n=10):
+    """ The n words ranked most like the word during its largest shock
+    """
+    window = shock_window(word, year)
+    if window is None or word not in window.vocab:
+        return {'word': word, 'year': year, 'similar': []}
+    return {'word': word, 'year': year, 'similar': [
+        [similar, float(score)] for score, similar in
+        test_rank(window, word, n)]}
+
+
+def query_plot(word, year, log=False):
+    """ The baseline plot of the word as a png
+    """
+    date, rank, bounds = word_bounds(word, year)
+    image = io.BytesIO()
+    # pyplot keeps global state, so only one thread can plot at a time
+    with _PLOT_LOCK:
+        baseline_plot(date, rank, bounds, word, year, log, filename=image)
+    return image.getvalue()
+
+
+def answer(path, params):
+    """ Answer a query for the path with the query string params, the same
+    way the server does but in this process. Returns the answer, raising a
+    KeyError for an unknown path or missing word, a LookupError for a year
+    without any days and a ValueError for a bad parameter
+    """
+    if path == '/stats':
+        return wordmemo.stats()
+    if not params.get('word'):
+        raise ValueError('No word given')
+    year = int(params.get('year', [2018])[0])
+    check_year(year)
+    if path == '/shock':
+        return query_shock(params['word'], year)
+    word = params['word'][0]
+    if path == '/series':
+        return query_series(word, year)
+    if path == '/baseline':
+        return query_baseline(word, year, float(params.get('k', [1.5])[0]))
+    if path == '/events':
+        return query_events(word, year, float(params.get('k', [1.5])[0]))
+    if path == '/similar':
+        return query_similar(word, year, int(params.get('n', [10])[0]))
+    if path == '/plot':
+        return query_plot(word, year, params.get('log', [''])[0] == 'true')
+    raise KeyError(path)
+
+
+class QueryHandler(http.server.BaseHTTPRequestHandler):
+    """ Answer the GET queries as JSON, or png for the plots
+    """
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        try:
+            result = answer(url.path, params)
+        except KeyError as error:
+            self.send_error(404, 'Unknown query {}'.format(error))
+            return
+        except LookupError as error:
+            self.send_error(404, str(error))
+            return
+        except ValueError as error:
+            self.send_error(400, str(error))
+            return
+        except Exception as error:
+            self.log_error('%s failed: %r', self.path, error)
+            self.send_error(500, 'Query failed: {}'.format(error))
+            return
+
+        if isinstance(result, bytes):
+            content_type = 'image/png'
+            body = result
+        else:
+            content_type = 'application/json'
+            body = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class QueryServer(http.server.ThreadingHTTPServer):
+    """ Answer each query on its own thread, with room in the listen queue
+    for a burst of queries to batch together
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(host='127.0.0.1', port=PORT, verbose=False):
+    """ Start the server, answering each query on its own thread. Returns the
+    server, running in the background
+    """
+    server = QueryServer((host, port), QueryHandler)
+    server.verbose = verbose
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def query(path, host='127.0.0.1', port=PORT, **params):
+    """ Ask the server a query, e.g. query('/shock', word='mac', year=2018).
+    A list of values sends the parameter more than once
+    """
+    url = 'http://{}:{}{}?{}'.format(host, port, path,
+                                     urllib.parse.urlencode(params, doseq=True))
+    with urllib.request.urlopen(url) as response:
+        body = response.read()
+        if response.headers['Content-Type'] == 'application/json':
+            return json.loads(body)
+        return body
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Answer shock queries for the rank store over HTTP")
+    parser.add_argument('--store', default='rank_store',
+                        help='the rank store to answer from')
+    parser.add_argument('--tarfile', default='top_daily_words_uni.tar_.gz',
+                        help='the tarfile to read from without a store')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='the address to listen on')
+    parser.add_argument('--port', type=int, default=PORT,
+                        help='the port to listen on')
+    parser.add_argument('--memory', type=float, default=512,
+                        help='the MB of results to keep in memory')
+    parser.add_argument('--verbose', action='store_true',
+                        help='log every query')
+    args = parser.parse_args()
+
+    open_source(args.store, args.tarfile)
+    wordmemo.set_limit(int(args.memory * 1024 ** 2))
+    server = serve(args.host, args.port, args.verbose)
+    print('Serving on {}:{} ...'.format(args.host, args.port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
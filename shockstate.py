@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: shockstate.py
+# author: brendan
+# last modified: 10-18-2026 20:10
+#-------------------------------------------------------------------------------
+"""
+Keep the baselines and shock events of a word list up to date as new days are
+appended to the rank store. The baselines and events of the year are saved
+next to the store, so a refresh only works out the baseline of the new days
+and rescores the events that run into them
+"""
+import os
+import glob
+import json
+import bisect
+import datetime as dt
+import numpy as np
+import argparse
+import rankstore
+import rankarchive
+import rankpyramid
+from baseline import block_bounds, window_starts
+from shockevents import Events, find_events, max_shock
+from batchshock import read_words
+
+STATE_DIR = 'shock-{}'
+STATE_FILE = 'state.json'
+WORDS_FILE = 'words.txt'
+LOWER_FILE = 'lower.npy'
+MEDIAN_FILE = 'median.npy'
+UPPER_FILE = 'upper.npy'
+EVENTS_FILE = 'events.npz'
+SCORES_FILE = 'scores.txt'
+
+
+def year_rows(store, year):
+    """ Find the first row of the year and the row just past its end
+    """
+    start = bisect.bisect_left(store.dates, dt.datetime(year, 1, 1))
+    end = bisect.bisect_left(store.dates, dt.datetime(year + 1, 1, 1))
+    return start, end
+
+
+def calc_bounds(store, words, first_row, end_row, k, months):
+    """ Calculate the median, lower and upper bounds of the rows from
+    first_row up to end_row, reading only the rows in their baseline windows
+    """
+    dates = store.dates[:end_row]
+    if first_row >= end_row:
+        return tuple(np.empty((0, len(words))) for _ in range(3))
+    window_row = window_starts(dates, months)[first_row]
+    block = rankstore.word_block(store, words, start=window_row)
+    block = block[:end_row - window_row]
+    bounds = block_bounds(dates[window_row:], block, k, months,
+                          start=first_row - window_row)
+    return bounds.median, bounds.lower, bounds.upper
+
+
+def save_state(state_dir, state, words, bounds, events):
+    """ Save the (median, lower, upper) baseline and events of the state,
+    along with the scores
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    with open(os.path.join(state_dir, STATE_FILE), 'w') as f:
+        json.dump(state, f)
+    with open(os.path.join(state_dir, WORDS_FILE), 'w') as f:
+        for word in words:
+            f.write('{}\n'.format(word))
+    for filename, values in zip([MEDIAN_FILE, LOWER_FILE, UPPER_FILE],
+                                bounds):
+        np.save(os.path.join(state_dir, filename), values)
+    np.savez(os.path.join(state_dir, EVENTS_FILE), **events._asdict())
+
+    shocks = max_shock(events, len(words))
+    with open(os.path.join(state_dir, SCORES_FILE), 'w') as f:
+        for word, shock_val in zip(words, shocks.tolist()):
+            # words without a shock get a score of 0, same as calc_max_shock
+            f.write('{},{}\n'.format(word, shock_val if shock_val > 0 else 0))
+
+
+def load_state(state_dir):
+    """ Load the state, words, lower bounds and events saved in state_dir
+    """
+    with open(os.path.join(state_dir, STATE_FILE)) as f:
+        state = json.load(f)
+    with open(os.path.join(state_dir, WORDS_FILE)) as f:
+        words = f.read().split('\n')[:-1]
+    lower = np.load(os.path.join(state_dir, LOWER_FILE))
+    with np.load(os.path.join(state_dir, EVENTS_FILE)) as f:
+        events = Events(**{field: f[field] for field in Events._fields})
+    return state, words, lower, events
+
+
+def load_bounds(state_dir, mmap_mode=None):
+    """ Load the median, lower and upper bounds saved in state_dir, or None
+    if the state was saved with only the lower bounds
+    """
+    try:
+        return tuple(np.load(os.path.join(state_dir, filename),
+                             mmap_mode=mmap_mode)
+                     for filename in [MEDIAN_FILE, LOWER_FILE, UPPER_FILE])
+    except FileNotFoundError:
+        return None
+
+
+def init_state(store_dir, year, words, k=1.5, months=6):
+    """ Work out the baseline and events of the words for the days of the
+    year in the store, and save them to be updated later
+    """
+    store = rankstore.load_store(store_dir)
+    start, end = year_rows(store, year)
+    bounds = calc_bounds(store, words, start, end, k, months)
+    ranks = rankstore.word_block(store, words, start=start)[:end - start]
+    events = find_events(ranks, bounds[1])
+
+    state = {'year': year, 'k': k, 'months': months}
+    state_dir = os.path.join(store_dir, STATE_DIR.format(year))
+    save_state(state_dir, state, words, bounds, events)
+    return state_dir
+
+
+def update_state(store_dir, state_dir):
+    """ Bring the state up to date with the days appended to the store. Only
+    the new days get a baseline, and only the events that reach the old last
+    day are scored again
+    """
+    state, words, lower, events = load_state(state_dir)
+    store = rankstore.load_store(store_dir)
+    start, end = year_rows(store, state['year'])
+    n_old = lower.shape[0]
+    if start + n_old >= end:
+        return 0
+
+    bounds = load_bounds(state_dir)
+    if bounds is None:
+        # the state only kept the lower bounds, so work the rest out again
+        bounds = calc_bounds(store, words, start, start + n_old, state['k'],
+                             state['months'])
+    new_bounds = calc_bounds(store, words, start + n_old, end, state['k'],
+                             state['months'])
+    bounds = tuple(np.concatenate([old, new]) for old, new in
+                   zip(bounds, new_bounds))
+    lower = bounds[1]
+
+    # the baseline of the old days doesn't change, so the only events that
+    # can change are the ones cut off by the old last day
+    cut_off = events.end == n_old - 1
+    if cut_off.any():
+        tail = max(events.start[cut_off].min() - 1, 0)
+    else:
+        tail = max(n_old - 1, 0)
+
+    ranks = rankstore.word_block(store, words, start=start + tail)
+    tail_events = find_events(ranks[:end - start - tail], lower[tail:])
+    # keep the tail events that reach the old last day, the rest are already
+    # in the saved events
+    keep = tail_events.end + tail >= n_old - 1
+    tail_events = Events(tail_events.column[keep],
+                         tail_events.start[keep] + tail,
+                         tail_events.end[keep] + tail,
+                         tail_events.area[keep], tail_events.depth[keep])
+
+    events = Events(*[np.concatenate([old[~cut_off], new]) for old, new in
+                      zip(events, tail_events)])
+    order = np.lexsort((events.start, events.column))
+    events = Events(*[values[order] for values in events])
+
+    save_state(state_dir, state, words, bounds, events)
+    return end - start - n_old
+
+
+def iter_sources(sources):
+    """ Iterate through the parsed days of the sources, which are either rank
+    tarfiles or daily rank files
+    """
+    for source in sources:
+        if source.endswith('.gz'):
+            for day in rankarchive.iter_parsed_days(source):
+                yield day
+        else:
+            date = rankarchive.parse_date(source)
+            if date is None:
+                continue
+            with open(source, 'rb') as f:
+                yield date, rankarchive.parse_day(f.read())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Keep the shock scores of the rank store up to date")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    init_parser = subparsers.add_parser(
+        'init', help='work out the baselines and events for a word list')
+    init_parser.add_argument('store', help='the rank store')
+    init_parser.add_argument('year', type=int, help='the year to score')
+    init_parser.add_argument('wordfile', help='the file of words to score')
+    update_parser = subparsers.add_parser(
+        'update', help='append new days and rescore the tail')
+    update_parser.add_argument('store', help='the rank store')
+    update_parser.add_argument('sources', nargs='+',
+                               help='rank tarfiles or daily rank files')
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        state_dir = init_state(args.store, args.year,
+                               read_words(args.wordfile))
+        print('Scores saved to {}'.format(os.path.join(state_dir,
+                                                       SCORES_FILE)))
+    else:
+        n_days = rankstore.append_days(args.store, iter_sources(args.sources))
+        print('Added {} days'.format(n_days))
+        # the pyramid levels that were built have to cover the new days too
+        levels = [level for level in ['week', 'month'] if os.path.exists(
+            os.path.join(args.store,
+                         rankpyramid.PYRAMID_FILE.format(level)))]
+        if n_days and levels:
+            rankpyramid.build_pyramid(args.store, levels)
+        for state_dir in glob.glob(os.path.join(args.store,
+                                                STATE_DIR.format('*'))):
+            n_rescored = update_state(args.store, state_dir)
+            print('{}: {} new days scored'.format(state_dir, n_rescored))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: similarity.py
+# author: brendan
+# last modified: 10-18-2026 20:25
+#-------------------------------------------------------------------------------
+"""
+Score how similar the rank distributions of many words are to the word with
+the shock, with the whole words x days block of ranks scored at once. The
+lagged correlations find the words that lead or follow the shock by a few days
+"""
+import numpy as np
+from scipy.stats import kstwo
+
+
+def centre(block):
+    """ Move every row of the block to a mean of 0
+    """
+    block = np.asarray(block, dtype=np.float64)
+    return block - block.mean(axis=-1, keepdims=True)
+
+
+def bw_scores(base, candidates, cumulative=True):
+    """ The brendan whitney test of the base against every row of the
+    candidates at once, the summed squared distance between them or the
+    largest one if not cumulative. Both are moved to a mean of 0 first
+    """
+    base = centre(base)
+    candidates = centre(candidates)
+    if candidates.shape[-1] != base.shape[-1]:
+        raise ValueError('Distributions do not have the same length')
+
+    dist = (candidates - base) ** 2
+    if cumulative:
+        return dist.sum(axis=1)
+    return dist.max(axis=1)
+
+
+def ks_scores(base, candidates, pvalue=False):
+    """ The two sample KS statistic of the base against every row of the
+    candidates at once, after moving them all to a mean of 0. Gives the same
+    statistic as ks_2samp. The p-values, if asked for, use the asymptotic
+    distribution
+    """
+    base = np.sort(centre(base))
+    candidates = np.sort(centre(candidates), axis=1)
+    n_rows, n2 = candidates.shape
+    n1 = base.size
+
+    # the number of base points below each candidate point. The candidate
+    # points at or below the jth base point are the ones with at most j base
+    # points below them, so shifting every row of these small integers into
+    # its own range turns the lookups into a single exact searchsorted
+    below = np.searchsorted(base, candidates, side='left')
+    offsets = (np.arange(n_rows, dtype=np.int64) * (n1 + 1))[:, np.newaxis]
+    row_starts = (np.arange(n_rows) * n2)[:, np.newaxis]
+    flat = (below + offsets).ravel()
+
+    # the cdfs of both samples at the base points
+    cdf1_base = np.searchsorted(base, base, side='right') / n1
+    cdf2_base = (np.searchsorted(flat, np.arange(n1) + offsets, side='right')
+                 - row_starts) / n2
+
+    # and at the candidate points, where the cdf of a row at a point is one
+    # past the last copy of that point in the sorted row
+    cdf1_cand = np.searchsorted(base, candidates, side='right') / n1
+    ends = np.full(candidates.shape, n2)
+    last = np.ones(candidates.shape, dtype=bool)
+    last[:, :-1] = candidates[:, 1:] != candidates[:, :-1]
+    ends[last] = np.nonzero(last)[1] + 1
+    cdf2_cand = np.minimum.accumulate(ends[:, ::-1], axis=1)[:, ::-1] / n2
+
+    stats = np.maximum(np.abs(cdf1_base - cdf2_base).max(axis=1),
+                       np.abs(cdf1_cand - cdf2_cand).max(axis=1))
+    if not pvalue:
+        return stats
+    en = np.round(n1 * n2 / (n1 + n2))
+    # the statistic only takes a few distinct values, so only work out the
+    # p-value once for each of them
+    values, inverse = np.unique(stats, return_inverse=True)
+    return stats, kstwo.sf(values, en)[inverse]
+
+
+def top_n(scores, keys, n):
+    """ Get the n smallest (score, key) pairs, in the same order as sorting
+    every pair, without sorting all of the scores
+    """
+    scores = np.asarray(scores)
+    if scores.size > n > 0:
+        # keep everything tied with the nth score, so ties still break on the
+        # key the same way a full sort does
+        nth = np.partition(scores, n - 1)[n - 1]
+        keep = np.flatnonzero(scores <= nth)
+    else:
+        keep = np.arange(scores.size)
+    keep_keys = [keys[i] for i in keep]
+    order = sorted(range(len(keep)),
+                   key=lambda i: (scores[keep[i]], keep_keys[i]))[:n]
+    return [(scores[keep[i]], keep_keys[i]) for i in order]
+
+
+def lagged_corr(base, candidates, max_lag):
+    """ The correlation of the base against every row of the candidates moved
+    by each lag from -max_lag to max_lag days. The candidates start max_lag
+    days before the base and end max_lag days after it. A negative lag means
+    the candidate moves before the base. Rows that don't change over the base
+    get a correlation of 0
+    """
+    base = centre(base)
+    candidates = np.asarray(candidates, dtype=np.float64)
+    n = base.size
+    n_lags = 2 * max_lag + 1
+    if candidates.shape[-1] != n + 2 * max_lag:
+        raise ValueError('Candidates need max_lag days on both sides')
+
+    # the sums of the base times each lagged stretch of the candidates, out of
+    # a single batch of FFTs
+    size = 1 << int(np.ceil(np.log2(candidates.shape[-1] + n)))
+    spectrum = (np.fft.rfft(candidates, size, axis=1)
+                * np.conj(np.fft.rfft(base, size)))
+    products = np.fft.irfft(spectrum, size, axis=1)[:, :n_lags]
+
+    # the spread of each lagged stretch out of the running sums
+    sums = np.zeros((candidates.shape[0], candidates.shape[1] + 1))
+    squares = np.zeros_like(sums)
+    np.cumsum(candidates, axis=1, out=sums[:, 1:])
+    np.cumsum(candidates ** 2, axis=1, out=squares[:, 1:])
+    total = sums[:, n:n + n_lags] - sums[:, :n_lags]
+    total_sq = squares[:, n:n + n_lags] - squares[:, :n_lags]
+    spread = np.sqrt(np.maximum(total_sq - total ** 2 / n, 0)
+                     * (base ** 2).sum())
+
+    corr = np.zeros_like(products)
+    np.divide(products, spread, out=corr, where=spread > 1e-9 * n)
+    return corr
+
+
+def best_lags(base, candidates, max_lag, chunk=4096):
+    """ Find the lag with the highest correlation for every row of the
+    candidates, working through the rows a chunk at a time. Returns the lags
+    and their correlations
+    """
+    lags = np.empty(candidates.shape[0], dtype=np.int64)
+    corrs = np.empty(candidates.shape[0])
+    for row in range(0, candidates.shape[0], chunk):
+        corr = lagged_corr(base, candidates[row:row + chunk], max_lag)
+        best = corr.argmax(axis=1)
+        lags[row:row + chunk] = best - max_lag
+        corrs[row:row + chunk] = corr[np.arange(corr.shape[0]), best]
+    return lags, corrs
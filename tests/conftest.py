@@ -0,0 +1,49 @@
+"""
+Put the scripts at the top of the repo on the path for the tests, and use the
+Agg backend so the plots don't need a display
+"""
+import os
+import sys
+import shutil
+import matplotlib
+matplotlib.use('Agg')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import benchmark
+import rankstore
+
+
+# shock0 shocks in october 2018 and shock1 in july 2018, on top of two years
+# of ranks
+SHOCKS = ['shock0:640:9:3', 'shock1:560:4:20']
+
+
+@pytest.fixture(scope='session')
+def synthetic_tarfile(tmp_path_factory):
+    """ A small synthetic tarfile of daily ranks from 2017 to 2018
+    """
+    filename = str(tmp_path_factory.mktemp('tar') /
+                   'top_daily_words_uni.tar_.gz')
+    benchmark.make_archive(filename, days=700, vocab=120, per_day=60,
+                           shocks=SHOCKS, seed=1)
+    return filename
+
+
+@pytest.fixture(scope='session')
+def store_dir(synthetic_tarfile, tmp_path_factory):
+    """ A rank store of the synthetic tarfile
+    """
+    store_dir = str(tmp_path_factory.mktemp('store') / 'rank_store')
+    rankstore.build_store(synthetic_tarfile, store_dir)
+    return store_dir
+
+
+@pytest.fixture
+def own_store(store_dir, tmp_path):
+    """ A copy of the rank store for the tests that change it
+    """
+    own_dir = str(tmp_path / 'rank_store')
+    shutil.copytree(store_dir, own_dir)
+    return own_dir
@@ -0,0 +1,27 @@
+"""
+Tests for the rolling baseline
+"""
+import datetime as dt
+import numpy as np
+from baseline import block_bounds, calc_prev_median, rolling_bounds
+
+
+def test_rolling_bounds_match_calc_prev_median():
+    rng = np.random.default_rng(3)
+    dates = [dt.datetime(2017, 1, 1) + dt.timedelta(n) for n in range(400)]
+    # a duplicate day and a missing one
+    dates[100] = dates[99]
+    del dates[200]
+    ranks = rng.integers(1, 500, len(dates)).tolist()
+    data = list(zip(dates, ranks))
+
+    bounds = rolling_bounds(dates, ranks)
+    block = block_bounds(dates, np.array(ranks)[:, np.newaxis])
+    for i, date in enumerate(dates):
+        _, median, lower, upper = calc_prev_median(date, data)
+        assert np.isclose(bounds.median[i], median)
+        assert np.isclose(bounds.lower[i], lower)
+        assert np.isclose(bounds.upper[i], upper)
+        assert np.isclose(block.median[i, 0], median)
+        assert np.isclose(block.lower[i, 0], lower)
+        assert np.isclose(block.upper[i, 0], upper)
@@ -0,0 +1,67 @@
+"""
+Tests for the bulk plot rendering
+"""
+import datetime as dt
+import numpy as np
+import rankstore
+import shockstate
+import bulkplot
+
+WORDS = ['shock0', 'shock1', 'w2', 'w7']
+
+
+def test_state_bounds_match_after_update(own_store):
+    state_dir = shockstate.init_state(own_store, 2018, WORDS)
+    store = rankstore.load_store(own_store)
+    days = [(store.dates[-1] + dt.timedelta(n + 1), {'w2': 3, 'shock0': 40})
+            for n in range(10)]
+    rankstore.append_days(own_store, days)
+    assert shockstate.update_state(own_store, state_dir) == 10
+
+    store = rankstore.load_store(own_store)
+    start, end = shockstate.year_rows(store, 2018)
+    expected = shockstate.calc_bounds(store, WORDS, start, end, 1.5, 6)
+    for saved, values in zip(shockstate.load_bounds(state_dir), expected):
+        assert np.allclose(saved, values)
+
+
+def test_render_reuses_saved_bounds(own_store, tmp_path, monkeypatch):
+    shockstate.init_state(own_store, 2018, WORDS[:3])
+    bulkplot.init_worker(own_store)
+    computed = []
+    block_bounds = bulkplot.block_bounds
+
+    def counted(dates, ranks, *args, **kwargs):
+        computed.append(ranks.shape[1])
+        return block_bounds(dates, ranks, *args, **kwargs)
+    monkeypatch.setattr(bulkplot, 'block_bounds', counted)
+
+    outdir = tmp_path / 'plots'
+    outdir.mkdir()
+    rendered = bulkplot.render_words(WORDS, 2018, str(outdir), {})
+    # only the word missing from the state gets its bounds worked out
+    assert computed == [1]
+    assert [word for word, _, _ in rendered] == WORDS
+    files = dict((word, files) for word, _, files in rendered)
+    assert files['shock0'] == ['shock0-2018-baseline-comparison.jpg',
+                               'shock0-2018-shock-event-comparison.jpg']
+    for word_files in files.values():
+        for filename in word_files:
+            assert (outdir / filename).exists()
+
+
+def test_render_again_after_appended_days(own_store, tmp_path):
+    outdir = tmp_path / 'plots'
+    outdir.mkdir()
+    bulkplot.init_worker(own_store)
+    manifest = {word: {'hash': word_hash, 'files': files} for word, word_hash,
+                files in bulkplot.render_words(WORDS, 2018, str(outdir), {})}
+    assert bulkplot.render_words(WORDS, 2018, str(outdir), manifest) == []
+
+    # days of words the store already has leave the vocabulary the same
+    store = rankstore.load_store(own_store)
+    rankstore.append_days(own_store, [(store.dates[-1] + dt.timedelta(40),
+                                       {'w2': 1, 'shock0': 2})])
+    bulkplot.init_worker(own_store)
+    rendered = bulkplot.render_words(WORDS, 2018, str(outdir), manifest)
+    assert [word for word, _, _ in rendered] == WORDS
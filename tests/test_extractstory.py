@@ -0,0 +1,98 @@
+"""
+Tests for the story extraction
+"""
+import datetime as dt
+import numpy as np
+import matplotlib.pyplot as plt
+import rankarchive
+import extractstory
+
+
+def make_window():
+    words = ['mac', 'apple', 'cheese']
+    dates = [dt.datetime(2018, 10, 1) + dt.timedelta(n) for n in range(5)]
+    ranks = np.array([[50, 10, 5, 10, 50],
+                      [60, 20, 8, 20, 60],
+                      [90, 90, 90, 90, 90]], dtype=np.int32)
+    return rankarchive.RankWindow(words, {word: i for i, word in
+                                          enumerate(words)}, dates, ranks)
+
+
+def test_comparison_date_plot_labels(tmp_path, monkeypatch):
+    saved = {}
+
+    def savefig(fig, filename, *args, **kwargs):
+        ax = fig.axes[0]
+        saved['filename'] = filename
+        saved['title'] = ax.get_title()
+        saved['lines'] = [(line.get_label(), line.get_color(),
+                           list(line.get_ydata())) for line in ax.get_lines()]
+    monkeypatch.setattr(plt.Figure, 'savefig', savefig)
+
+    window = make_window()
+    extractstory.comparison_date_plot(['apple', 'cheese'], window,
+                                      window.dates[0], window.dates[-1],
+                                      'mac', 2018)
+    assert saved['title'] == 'Rank plot for mac in 2018'
+    assert saved['filename'] == 'plots/mac-2018-shock-event-comparison.jpg'
+    labels = [label for label, _, _ in saved['lines']]
+    assert labels == ['apple', 'cheese', 'mac']
+    # the word itself is the black line
+    assert saved['lines'][-1][1] == 'k'
+    assert saved['lines'][-1][2] == [50, 10, 5, 10, 50]
+
+
+def test_read_top_words_skips_nan(tmp_path):
+    filename = tmp_path / 'scores.txt'
+    filename.write_text('a,5\nb,nan\nc,100\nd,nan\ne,7\nf,inf\ng,1\n')
+    assert extractstory.read_top_words(str(filename), 3) == ['c', 'e', 'a']
+
+
+def test_extract_stories_lag_file(synthetic_tarfile, tmp_path, monkeypatch):
+    monkeypatch.setattr(extractstory, 'TARFILE', synthetic_tarfile)
+    events = [('shock0', dt.datetime(2018, 10, 2), dt.datetime(2018, 10, 12)),
+              ('w2', dt.datetime(2018, 7, 9), dt.datetime(2018, 7, 14))]
+    outfile = tmp_path / 'stories.txt'
+    lagfile = tmp_path / 'lags.txt'
+
+    extractstory.extract_stories(events, 2018, str(outfile), n=3, plot=False)
+    assert len(outfile.read_text().splitlines()) == 2
+    assert not lagfile.exists()
+
+    extractstory.extract_stories(events, 2018, str(outfile), n=3, plot=False,
+                                 max_lag=2, lagfile=str(lagfile))
+    lines = lagfile.read_text().splitlines()
+    assert [line.split(',')[0] for line in lines] == ['shock0', 'w2']
+    assert all(len(line.split(',')[3].split()) == 3 for line in lines)
+
+
+def test_lag_with_a_gap_and_the_end_of_the_data(monkeypatch):
+    rng = np.random.default_rng(4)
+    # the archive is missing 10-08 and ends on 10-18
+    dates = [dt.datetime(2018, 10, 7) + dt.timedelta(n) for n in range(13)]
+    have = [date for date in dates if date.day != 8 and date.day <= 18]
+    mac = rng.integers(1, 1000, len(have) + 1)
+    days = [(date, {'mac': int(mac[i]), 'lead': int(mac[i + 1]),
+                    'noise': int(rng.integers(1, 1000))})
+            for i, date in enumerate(have)]
+    window = rankarchive.build_window(iter(days), dates)
+
+    start_date = dt.datetime(2018, 10, 10)
+    end_date = dt.datetime(2018, 10, 16)
+    top = extractstory.test_lag(window, 'mac', 2, 3, start_date, end_date)
+    corr, lag, word = top[0]
+    assert word == 'lead' and lag == -1 and np.isclose(corr, 1)
+
+    # the base is every day of the event, not a fixed slice of the window
+    captured = {}
+
+    def best_lags(base, candidates, max_lag):
+        captured['base'] = base.tolist()
+        captured['max_lag'] = max_lag
+        return np.zeros(len(candidates), dtype=np.int64), \
+            np.zeros(len(candidates))
+    monkeypatch.setattr(extractstory, 'best_lags', best_lags)
+    extractstory.test_lag(window, 'mac', 2, 3, start_date, end_date)
+    assert captured['base'] == mac[2:9].tolist()
+    # only two days are left after the event
+    assert captured['max_lag'] == 2
@@ -0,0 +1,20 @@
+"""
+Tests for reading the daily rank archive
+"""
+import datetime as dt
+import numpy as np
+import rankarchive
+
+
+def test_window_only_has_the_archive_dates():
+    dates = [dt.datetime(2018, 3, 1) + dt.timedelta(n) for n in range(5)]
+    # the archive is missing the third day and has the second one twice
+    days = [(dates[0], {'a': 1, 'b': 2}), (dates[1], {'a': 4}),
+            (dates[1], {'a': 3, 'c': 9}), (dates[3], {'b': 1}),
+            (dates[4], {'a': 2})]
+    window = rankarchive.build_window(iter(days), dates, cutoff=100)
+    assert window.dates == [dates[0], dates[1], dates[3], dates[4]]
+    assert window.words == ['a', 'b', 'c']
+    assert np.array_equal(window.ranks, [[1, 3, 100, 2],
+                                         [2, 100, 1, 100],
+                                         [100, 9, 100, 100]])
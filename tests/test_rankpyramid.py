@@ -0,0 +1,68 @@
+"""
+Tests for the weekly and monthly rank pyramid
+"""
+import datetime as dt
+import numpy as np
+import pytest
+import rankstore
+import rankpyramid
+from shockdetector import calc_store_shocks
+
+
+def test_build_pyramid_stats(own_store):
+    rankpyramid.build_pyramid(own_store)
+    store = rankstore.load_store(own_store)
+    for level in ['week', 'month']:
+        pyramid = rankpyramid.load_pyramid(own_store, level, store)
+        rows = pyramid.rows
+        assert rows[0] == 0 and rows[-1] == len(store.dates)
+        for i in [0, len(pyramid.periods) // 2, len(pyramid.periods) - 1]:
+            block = np.array(store.ranks[rows[i]:rows[i + 1]])
+            assert np.array_equal(pyramid.stats[0, i], block.min(axis=0))
+            assert np.allclose(pyramid.stats[1, i], np.median(block, axis=0))
+            assert np.array_equal(pyramid.stats[2, i], block.max(axis=0))
+            assert all(rankpyramid.period_start(date, level) ==
+                       pyramid.periods[i]
+                       for date in store.dates[rows[i]:rows[i + 1]])
+
+
+def test_load_pyramid_out_of_date(own_store):
+    rankpyramid.build_pyramid(own_store, ['week'])
+    store = rankstore.load_store(own_store)
+    rankstore.append_days(own_store, [(store.dates[-1] + dt.timedelta(1),
+                                       {'w1': 1})])
+    with pytest.raises(ValueError, match='out of date'):
+        rankpyramid.load_pyramid(own_store, 'week')
+
+
+def test_screen_keeps_the_known_shocks(own_store, monkeypatch):
+    rankpyramid.build_pyramid(own_store, ['week'])
+    store = rankstore.load_store(own_store)
+    pyramid = rankpyramid.load_pyramid(own_store, 'week', store)
+    cols = rankpyramid.screen_words(pyramid, 2018, chunk=7)
+    assert np.array_equal(cols, rankpyramid.screen_words(pyramid, 2018))
+    kept = [store.words[col] for col in cols]
+    assert 'shock0' in kept and 'shock1' in kept
+    assert len(kept) < len(store.words)
+
+    chunks = []
+    screen_words = rankpyramid.screen_words
+
+    def screened(pyramid, year, chunk=16384):
+        chunks.append(chunk)
+        return screen_words(pyramid, year, chunk=chunk)
+    monkeypatch.setattr(rankpyramid, 'screen_words', screened)
+    shocks = dict(rankpyramid.screen_shocks(own_store, 2018, chunk=7))
+    # the screen keeps to the chunk the caller asked for
+    assert chunks == [7]
+    for word, score in zip(['shock0', 'shock1'],
+                           calc_store_shocks(store, ['shock0', 'shock1'],
+                                             2018)):
+        assert np.isclose(shocks[word], score)
+
+
+def test_screen_year_not_in_pyramid(own_store):
+    rankpyramid.build_pyramid(own_store, ['month'])
+    pyramid = rankpyramid.load_pyramid(own_store, 'month')
+    with pytest.raises(ValueError, match='no periods in 2030'):
+        rankpyramid.screen_words(pyramid, 2030)
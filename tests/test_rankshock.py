@@ -0,0 +1,37 @@
+"""
+Tests for ranking the shock scores
+"""
+import rankshock
+
+
+def write_shards(tmp_path):
+    shards = ['a,5\nb,3\n@u,10\nc,nan\n#h,2\n@v,nan\n',
+              'b,50\na,1\nd,4\nc,7\n@u,nan\n',
+              'e,6\nb,2\n#h,9\n@v,nan\n']
+    filenames = []
+    for i, shard in enumerate(shards):
+        filename = tmp_path / 'shard{}.txt'.format(i)
+        filename.write_text(shard)
+        filenames.append(str(filename))
+    return filenames
+
+
+def test_top_scores_keeps_the_highest_score(tmp_path):
+    filenames = write_shards(tmp_path)
+    missing, top = rankshock.top_scores(rankshock.iter_scores(filenames), 3)
+    # c and @u are missing from one shard but scored in another
+    assert missing == ['@v']
+    assert top['word'] == [('b', 50.0), ('c', 7.0), ('e', 6.0)]
+    assert top['user'] == [('@u', 10.0)]
+    assert top['hashtag'] == [('#h', 9.0)]
+
+
+def test_table_matches_top_scores(tmp_path):
+    filenames = write_shards(tmp_path)
+    missing, top = rankshock.top_scores(rankshock.iter_scores(filenames), 3)
+    table_dir = str(tmp_path / 'table')
+    rankshock.build_table(filenames, table_dir)
+    for cat in ['user', 'hashtag', 'word']:
+        assert rankshock.query_table(table_dir, cat, 3) == top[cat]
+    assert [word for word, _ in
+            rankshock.query_table(table_dir, 'missing', 10)] == missing
@@ -0,0 +1,36 @@
+"""
+Tests for the rank store
+"""
+import os
+import datetime as dt
+import numpy as np
+import rankstore
+
+
+def test_append_after_a_killed_append(own_store):
+    store = rankstore.load_store(own_store)
+    n_days = len(store.dates)
+    last_date = store.dates[-1]
+    # a killed append that wrote its rows, a word and part of a date, but
+    # never got to the meta file
+    with open(os.path.join(own_store, rankstore.RANKS_FILE), 'ab') as f:
+        f.write(np.full(3 * store.ranks.shape[1] + 7, 1,
+                        dtype=np.int32).tobytes())
+    with open(os.path.join(own_store, rankstore.VOCAB_FILE), 'a') as f:
+        f.write('orphan\n')
+    with open(os.path.join(own_store, rankstore.DATES_FILE), 'a') as f:
+        f.write('2030-01-01\n2030-01')
+
+    store = rankstore.load_store(own_store)
+    assert len(store.dates) == n_days
+    assert 'orphan' not in store.vocab
+
+    days = [(last_date + dt.timedelta(n + 1), {'w2': n + 1, 'fresh': 4})
+            for n in range(2)]
+    assert rankstore.append_days(own_store, days) == 2
+    store = rankstore.load_store(own_store)
+    assert store.dates[n_days:] == [date for date, _ in days]
+    assert 'orphan' not in store.vocab
+    assert store.ranks[n_days:, store.vocab['w2']].tolist() == [1, 2]
+    assert store.ranks[n_days:, store.vocab['fresh']].tolist() == [4, 4]
+    assert (store.ranks[n_days:, store.vocab['w5']] != 1).all()
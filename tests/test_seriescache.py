@@ -0,0 +1,99 @@
+"""
+Tests for the series cache
+"""
+import os
+import datetime as dt
+import seriescache
+
+SERIES = [(dt.datetime(2018, 1, 1) + dt.timedelta(n), 10 + n)
+          for n in range(5)]
+
+
+def make_tarfile(tmp_path):
+    filename = str(tmp_path / 'ranks.tar_.gz')
+    with open(filename, 'wb') as f:
+        f.write(b'ranks')
+    return filename
+
+
+def fake_reader(calls):
+    def get_full_data(words, tarfile_name, year, cutoff):
+        calls.append(list(words))
+        return {word: [(date, rank + 1) for date, rank in SERIES]
+                for word in words}
+    return get_full_data
+
+
+def test_round_trip(tmp_path):
+    cache_dir = str(tmp_path)
+    seriescache.save_series(SERIES, "kanye's/#x", 2018, cache_dir=cache_dir)
+    assert seriescache.load_series("kanye's/#x", 2018,
+                                   cache_dir=cache_dir) == SERIES
+
+
+def test_fingerprinted_entry_is_used(tmp_path, monkeypatch):
+    tarfile_name = make_tarfile(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = []
+    monkeypatch.setattr(seriescache, 'get_full_data', fake_reader(calls))
+
+    first = seriescache.load_full_data('mac', 2018, tarfile_name,
+                                       cache_dir=cache_dir)
+    second = seriescache.load_full_data('mac', 2018, tarfile_name,
+                                        cache_dir=cache_dir)
+    assert calls == [['mac']]
+    assert first == second
+
+
+def test_changed_tarfile_is_stale(tmp_path, monkeypatch):
+    tarfile_name = make_tarfile(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = []
+    monkeypatch.setattr(seriescache, 'get_full_data', fake_reader(calls))
+
+    seriescache.load_full_data('mac', 2018, tarfile_name, cache_dir=cache_dir)
+    with open(tarfile_name, 'ab') as f:
+        f.write(b'more days')
+    seriescache.load_full_data('mac', 2018, tarfile_name, cache_dir=cache_dir)
+    assert calls == [['mac'], ['mac']]
+
+
+def test_unfingerprinted_entry_is_stale_with_a_tarfile(tmp_path, monkeypatch):
+    tarfile_name = make_tarfile(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    calls = []
+    monkeypatch.setattr(seriescache, 'get_full_data', fake_reader(calls))
+
+    # like a converted pickle
+    seriescache.save_series(SERIES, 'rip', 2018, cache_dir=cache_dir)
+    series = seriescache.load_full_data('rip', 2018, tarfile_name,
+                                        cache_dir=cache_dir)
+    assert calls == [['rip']]
+    assert series != SERIES
+    # and the entry read again now has the tarfile's fingerprint
+    assert seriescache.load_series(
+        'rip', 2018, seriescache.archive_fingerprint(tarfile_name),
+        cache_dir=cache_dir) == series
+
+
+def test_unfingerprinted_entry_without_a_tarfile(tmp_path):
+    cache_dir = str(tmp_path)
+    seriescache.save_series(SERIES, 'rip', 2018, cache_dir=cache_dir)
+    fingerprint = seriescache.archive_fingerprint(
+        os.path.join(cache_dir, 'missing.tar_.gz'))
+    assert fingerprint is None
+    assert seriescache.load_series('rip', 2018, fingerprint,
+                                   cache_dir=cache_dir) == SERIES
+
+
+def test_evict_drops_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    for i, word in enumerate(['a', 'b', 'c']):
+        seriescache.save_series(SERIES, word, 2018, cache_dir=cache_dir)
+        name = seriescache.cache_name(word, 2018, cache_dir)
+        os.utime(name, ns=(i * 10 ** 9, i * 10 ** 9))
+    size = os.path.getsize(seriescache.cache_name('a', 2018, cache_dir))
+    # using a marks it as the most recent
+    seriescache.load_arrays('a', 2018, cache_dir=cache_dir)
+    assert seriescache.evict(cache_dir, 2 * size) == 1
+    assert not os.path.exists(seriescache.cache_name('b', 2018, cache_dir))
@@ -0,0 +1,48 @@
+"""
+Tests for the monthly shape index
+"""
+import datetime as dt
+import pytest
+import rankstore
+import shapeindex
+
+
+def test_query_finds_closest_shapes(own_store):
+    shapeindex.build_index(own_store, 2018)
+    store = rankstore.load_store(own_store)
+    index = shapeindex.load_index(own_store, 2018, store)
+    words, checked = shapeindex.query(store, index, 'w3', 2018, 10, n=5)
+    assert len(words) == 5
+    assert 'w3' not in [word for _, word in words]
+    assert [dist for dist, _ in words] == sorted(dist for dist, _ in words)
+    assert checked <= len(store.words)
+
+
+def test_index_out_of_date_after_append(own_store):
+    shapeindex.build_index(own_store, 2018)
+    store = rankstore.load_store(own_store)
+    index = shapeindex.load_index(own_store, 2018, store)
+
+    next_day = store.dates[-1] + dt.timedelta(1)
+    rankstore.append_days(own_store, [(next_day, {'w1': 1, 'brandnew': 2})])
+    with pytest.raises(ValueError):
+        shapeindex.load_index(own_store, 2018)
+    # an index loaded before the append can't be queried against the new
+    # store either
+    with pytest.raises(ValueError):
+        shapeindex.query(rankstore.load_store(own_store), index, 'w3', 2018,
+                         10)
+
+
+def test_query_month_not_in_index(own_store):
+    store = rankstore.load_store(own_store)
+    # the store ends on the first of december, too short a month to index
+    shapeindex.build_index(own_store, 2018)
+    index = shapeindex.load_index(own_store, 2018, store)
+    with pytest.raises(ValueError, match='no 2018-12'):
+        shapeindex.query(store, index, 'w3', 2018, 12)
+
+    shapeindex.build_index(own_store, 2030)
+    index = shapeindex.load_index(own_store, 2030, store)
+    with pytest.raises(ValueError, match='no days in 2030-05'):
+        shapeindex.query(store, index, 'w3', 2030, 5)
@@ -0,0 +1,80 @@
+"""
+Tests for the shock scores
+"""
+import numpy as np
+import pytest
+import rankstore
+from baseline import year_bounds
+from shockdetector import calc_max_shock, calc_store_shocks
+
+
+def old_calc_max_shock(rank, l_bound):
+    """ The calc_max_shock the event finding replaced, kept to check against
+    """
+    z = np.array(rank) - np.array(l_bound)
+    shock_ix = (z < 0).nonzero()[0]
+    if shock_ix.size == 0:
+        return 0
+    new_ixs = []
+    events = []
+    event = 0
+    for ix in shock_ix:
+        if (shock_ix != ix - 1).all():
+            new_ixs.append(ix - 1)
+            events.append(event)
+        new_ixs.append(ix)
+        events.append(event)
+        if (shock_ix != ix + 1).all():
+            new_ixs.append(ix + 1)
+            events.append(event)
+            event += 1
+
+    event_sizes = np.empty(max(events) + 1)
+    shock_ix = np.array(new_ixs)
+    events = np.array(events)
+    for event in range(min(events), max(events) + 1):
+        event_ix = np.where(events == event, shock_ix, 0)
+        event_ix = event_ix[event_ix != 0]
+        event_z = z[event_ix]
+        first_intersect = - 1 / (event_z[1] - event_z[0]) * event_z[0]
+        last_intersect = - 1 / (event_z[-1] - event_z[-2]) * event_z[-2]
+        area = 0.5 * (1 - first_intersect) * abs(event_z[1])
+        area += 0.5 * last_intersect * abs(event_z[-2])
+        if len(event_ix) > 3:
+            middle = event_z[1:-1]
+            area += (abs(middle[:-1] + middle[1:]) * 0.5).sum()
+        event_sizes[event] = area
+    return max(event_sizes)
+
+
+def test_find_events_match_old_calc_max_shock(store_dir):
+    store = rankstore.load_store(store_dir)
+    n_checked = 0
+    for word in store.words:
+        _, rank, bounds = year_bounds(rankstore.word_series(store, word, 2018),
+                                      2018)
+        below = rank < bounds.lower
+        # the old code wrapped around on events at the ends of the year
+        if below[0] or below[-1]:
+            continue
+        assert np.isclose(calc_max_shock(rank, bounds.lower),
+                          old_calc_max_shock(rank, bounds.lower))
+        n_checked += 1
+    assert n_checked > 100
+
+
+def test_store_shocks_match_word_shocks(store_dir):
+    store = rankstore.load_store(store_dir)
+    words = ['shock0', 'shock1', 'w3', 'never-seen']
+    shocks = calc_store_shocks(store, words, 2018)
+    for word, shock in zip(words, shocks):
+        _, rank, bounds = year_bounds(rankstore.word_series(store, word, 2018),
+                                      2018)
+        assert np.isclose(shock, calc_max_shock(rank, bounds.lower))
+    assert shocks[0] > 0 and shocks[1] > 0
+
+
+def test_store_shocks_year_not_in_store(store_dir):
+    store = rankstore.load_store(store_dir)
+    with pytest.raises(ValueError, match='no days in 2030'):
+        calc_store_shocks(store, ['shock0'], 2030)
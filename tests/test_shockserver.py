@@ -0,0 +1,103 @@
+"""
+Tests for the shock query server
+"""
+import urllib.error
+import pytest
+import rankstore
+import wordmemo
+import shockserver
+from shockdetector import calc_store_shocks
+
+
+@pytest.fixture
+def server_source(store_dir, synthetic_tarfile):
+    wordmemo.clear()
+    shockserver.open_source(store_dir, synthetic_tarfile)
+    yield store_dir
+    wordmemo.clear()
+
+
+def test_multi_word_shock_is_one_batch(server_source, monkeypatch):
+    calls = []
+
+    def scored(store, words, year):
+        calls.append((list(words), year))
+        return calc_store_shocks(store, words, year)
+    monkeypatch.setattr(shockserver, 'calc_store_shocks', scored)
+
+    words = ['shock0', 'w1', 'shock1', 'w5']
+    result = shockserver.answer('/shock', {'word': words, 'year': ['2018']})
+    assert len(calls) == 1
+    assert sorted(calls[0][0]) == sorted(words)
+
+    store = rankstore.load_store(server_source)
+    expected = dict(zip(words, calc_store_shocks(store, words, 2018)))
+    assert result == {'year': 2018, 'shocks': expected}
+    assert result['shocks']['shock0'] > 0
+
+
+def test_bad_year_only_fails_its_own_queries(server_source):
+    good = {'word': 'shock0', 'year': 2018, 'done': shockserver.threading.Event(),
+            'shock': None, 'error': None}
+    bad = dict(good, year=1990, done=shockserver.threading.Event())
+    shockserver.score_batch([bad, good])
+    assert good['error'] is None and good['shock'] > 0
+    assert isinstance(bad['error'], ValueError)
+    assert good['done'].is_set() and bad['done'].is_set()
+
+
+def test_server_errors(server_source, monkeypatch):
+    server = shockserver.serve(port=0)
+    port = server.server_address[1]
+    try:
+        assert shockserver.query('/shock', port=port, word='shock0',
+                                 year=2018)['shocks']['shock0'] > 0
+        assert shockserver.query('/plot', port=port,
+                                 word='shock0')[:4] == b'\x89PNG'
+        for path, params, code in [('/nope', {'word': 'a'}, 404),
+                                   ('/shock', {}, 400),
+                                   ('/shock', {'word': 'a', 'year': 'x'},
+                                    400)]:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                shockserver.query(path, port=port, **params)
+            assert error.value.code == code
+
+        def broken(path, params):
+            raise RuntimeError('broken')
+        monkeypatch.setattr(shockserver, 'answer', broken)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            shockserver.query('/series', port=port, word='shock0')
+        assert error.value.code == 500
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_year_without_days_is_not_found(server_source):
+    server = shockserver.serve(port=0)
+    port = server.server_address[1]
+    try:
+        for path in ['/series', '/baseline', '/events', '/similar', '/shock']:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                shockserver.query(path, port=port, word='shock0', year=1990)
+            assert error.value.code == 404
+            assert 'no days in 1990' in error.value.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_year_without_days_from_the_tarfile(synthetic_tarfile, tmp_path,
+                                            monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    wordmemo.clear()
+    shockserver.open_source(str(tmp_path / 'no_store'), synthetic_tarfile)
+    try:
+        for path in ['/series', '/baseline', '/shock']:
+            with pytest.raises(LookupError, match='no days of shock0 in 1990'):
+                shockserver.answer(path, {'word': ['shock0'],
+                                          'year': ['1990']})
+        assert shockserver.answer('/series', {'word': ['shock0'],
+                                              'year': ['2018']})['dates']
+    finally:
+        wordmemo.clear()
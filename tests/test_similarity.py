@@ -0,0 +1,55 @@
+"""
+Tests for the batched similarity scores
+"""
+import numpy as np
+from scipy.stats import ks_2samp
+import similarity
+
+
+def test_ks_scores_match_ks_2samp():
+    rng = np.random.default_rng(0)
+    base = rng.integers(1, 100001, 30).astype(np.float64)
+    candidates = rng.integers(1, 100001, (200, 30)).astype(np.float64)
+    # rows that only differ from the base by a shift, so they centre onto
+    # values within rounding of the base's
+    candidates[0] = base + 0.1
+    candidates[1] = base + 1 / 3
+    candidates[2] = base * 1.0000001
+    # rows full of ties, and the base itself
+    candidates[3] = 100001
+    candidates[4] = np.repeat(base[:3], 10)
+    candidates[5] = base
+
+    stats = similarity.ks_scores(base, candidates)
+    expected = [ks_2samp(similarity.centre(base), similarity.centre(row),
+                         method='asymp').statistic for row in candidates]
+    assert np.allclose(stats, expected, rtol=0, atol=1e-12)
+
+
+def test_ks_scores_different_lengths():
+    rng = np.random.default_rng(1)
+    base = rng.normal(0, 10, 17)
+    candidates = rng.normal(0, 10, (20, 40)).round()
+    stats = similarity.ks_scores(base, candidates)
+    expected = [ks_2samp(similarity.centre(base), similarity.centre(row),
+                         method='asymp').statistic for row in candidates]
+    assert np.allclose(stats, expected, rtol=0, atol=1e-12)
+
+
+def test_top_n_matches_sorting():
+    scores = np.array([5, 1, 3, 1, 3, 9, 0, 3])
+    keys = ['e', 'b', 'd', 'a', 'c', 'z', 'y', 'b']
+    assert similarity.top_n(scores, keys, 4) == \
+        sorted(zip(scores, keys))[:4]
+
+
+def test_lagged_corr_matches_corrcoef():
+    rng = np.random.default_rng(2)
+    max_lag = 3
+    base = rng.normal(0, 1, 20)
+    candidates = rng.normal(0, 1, (5, 20 + 2 * max_lag))
+    corr = similarity.lagged_corr(base, candidates, max_lag)
+    for row in range(5):
+        for j, lag in enumerate(range(-max_lag, max_lag + 1)):
+            stretch = candidates[row, max_lag + lag:max_lag + lag + 20]
+            assert np.isclose(corr[row, j], np.corrcoef(base, stretch)[0, 1])
@@ -0,0 +1,44 @@
+"""
+Tests for the in-process memo of word results
+"""
+import datetime as dt
+import numpy as np
+import pytest
+import rankstore
+import wordmemo
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    wordmemo.clear()
+    yield
+    wordmemo.clear()
+
+
+def test_appended_days_are_seen(own_store):
+    before = wordmemo.word_series('w2', 2018, None, store_dir=own_store)
+    date, _, _ = wordmemo.word_bounds('w2', 2018, None, store_dir=own_store)
+    assert wordmemo.word_series('w2', 2018, None, store_dir=own_store) \
+        is before
+
+    store = rankstore.load_store(own_store)
+    days = [(store.dates[-1] + dt.timedelta(n + 1), {'w2': 3})
+            for n in range(5)]
+    rankstore.append_days(own_store, days)
+
+    after = wordmemo.word_series('w2', 2018, None, store_dir=own_store)
+    assert after[:len(before)] == before
+    assert after[len(before):] == [(day, 3) for day, _ in days]
+    new_date, rank, _ = wordmemo.word_bounds('w2', 2018, None,
+                                             store_dir=own_store)
+    assert new_date[len(date):] == [day for day, _ in days]
+    assert (rank[len(date):] == 3).all()
+
+
+def test_size_of_counts_the_base_of_views():
+    base = np.zeros(10000)
+    view = base[:10]
+    assert wordmemo.size_of(view) >= base.nbytes
+    # the base is only counted once when a result holds a few views of it
+    assert wordmemo.size_of((view, base[10:20])) < 2 * base.nbytes
+    assert wordmemo.size_of(base) < base.nbytes + 1000
@@ -6,7 +6,6 @@ filename=$PWD"/test.txt"
 
 echo $filename
 
-while read -r line; do
-    ./shockdetector.py $line
-    echo $line
-done < "$filename"
+# score every word in the file across all the cores of the node, sharing one
+# rank store between the workers
+./batchshock.py $PWD ${PBS_JOBID:-shock} $filename
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# created on: 10-18-2026
+# filename: wordmemo.py
+# author: brendan
+# last modified: 10-18-2026 20:40
+#-------------------------------------------------------------------------------
+"""
+Keep the rank series, baselines, shock events and rank windows of the words
+looked at in this process in memory, so calling the plotting and story scripts
+over and over from a notebook or the REPL doesn't read and recompute them
+every time. The least recently used results are dropped once the memo goes
+over its memory limit, and the memo can be shared between threads. The
+results out of a rank store are kept by the number of days in the store, so
+they are worked out again once days are appended to it
+"""
+import os
+import sys
+import json
+import threading
+import collections
+import numpy as np
+import rankstore
+import seriescache
+from baseline import year_bounds
+from shockevents import find_events
+
+MAX_BYTES = 512 * 1024 ** 2
+
+# the memoized results by key, oldest first, with their size in bytes
+_MEMO = collections.OrderedDict()
+_LOCK = threading.Lock()
+# the open rank stores by directory, with their number of days
+_STORES = {}
+_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0,
+          'max_bytes': MAX_BYTES}
+
+
+def size_of(value, seen=None):
+    """ Estimate the memory a result takes up, counting the data of arrays and
+    the items of tuples and lists. A view keeps the whole of the array it was
+    taken from in memory, so it counts that array's data, once per result.
+    Views of a memmap only count their own data
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        # getsizeof already counts the data of an array that owns it
+        size = sys.getsizeof(value) - (value.nbytes if value.flags.owndata
+                                       else 0)
+        if isinstance(base, np.memmap):
+            return size + value.nbytes
+        if id(base) in seen:
+            return size
+        seen.add(id(base))
+        return size + base.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item, seen)
+                                          for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(key, seen) +
+                                          size_of(item, seen)
+                                          for key, item in value.items())
+    return sys.getsizeof(value)
+
+
+def evict(max_bytes):
+    """ Drop the least recently used results until the memo fits in max_bytes
+    """
+    while _MEMO and _STATS['bytes'] > max_bytes:
+        _, (_, size) = _MEMO.popitem(last=False)
+        _STATS['bytes'] -= size
+        _STATS['evictions'] += 1
+
+
+def set_limit(max_bytes):
+    """ Change the memory limit of the memo, dropping results if it is over
+    """
+    with _LOCK:
+        _STATS['max_bytes'] = max_bytes
+        evict(max_bytes)
+
+
+def memo(key, func):
+    """ Get the result saved under the key, or call func and save its result.
+    A result bigger than the whole limit is returned without being saved
+    """
+    with _LOCK:
+        if key in _MEMO:
+            _MEMO.move_to_end(key)
+            _STATS['hits'] += 1
+            return _MEMO[key][0]
+        _STATS['misses'] += 1
+
+    # work the result out without the lock, so other threads aren't held up
+    value = func()
+    size = size_of(value)
+    with _LOCK:
+        if size <= _STATS['max_bytes'] and key not in _MEMO:
+            _MEMO[key] = (value, size)
+            _STATS['bytes'] += size
+            evict(_STATS['max_bytes'])
+    return value
+
+
+def stats():
+    """ The hits, misses, evictions and size of the memo so far
+    """
+    with _LOCK:
+        return dict(_STATS, entries=len(_MEMO))
+
+
+def clear():
+    """ Drop every result and reset the counters
+    """
+    with _LOCK:
+        _MEMO.clear()
+        _STORES.clear()
+        _STATS.update(hits=0, misses=0, evictions=0, bytes=0)
+
+
+def store_days(store_dir):
+    """ The number of days in the rank store, out of its meta file
+    """
+    with open(os.path.join(store_dir, rankstore.META_FILE)) as f:
+        return json.load(f)['shape'][0]
+
+
+def open_store(store_dir):
+    """ Get the rank store in store_dir and its number of days, opening it
+    again if days have been appended since it was last opened
+    """
+    n_days = store_days(store_dir)
+    with _LOCK:
+        if store_dir in _STORES and _STORES[store_dir][1] == n_days:
+            return _STORES[store_dir]
+    store = rankstore.load_store(store_dir)
+    with _LOCK:
+        _STORES[store_dir] = (store, len(store.dates))
+        return _STORES[store_dir]
+
+
+def has_store(store_dir):
+    """ Whether there is a rank store in store_dir
+    """
+    return store_dir is not None and os.path.isdir(store_dir)
+
+
+def source_key(tarfile_name, store_dir):
+    """ The part of the memo keys for where the ranks come from, the store
+    and its number of days or else the tarfile
+    """
+    if has_store(store_dir):
+        return store_dir, store_days(store_dir)
+    return tarfile_name
+
+
+def word_series(word, year, tarfile_name, cutoff=100001, store_dir=None):
+    """ Get the (date, rank) data of the word in the year, out of the rank
+    store if there is one and from the series cache if not
+    """
+    if has_store(store_dir):
+        store, n_days = open_store(store_dir)
+        return memo(('series', word, year, store_dir, n_days),
+                    lambda: rankstore.word_series(store, word, year))
+    return memo(('series', word, year, tarfile_name, cutoff),
+                lambda: seriescache.load_full_data(word, year, tarfile_name,
+                                                   cutoff))
+
+
+def word_bounds(word, year, tarfile_name, cutoff=100001, store_dir=None,
+                k=1.5, months=6):
+    """ Get the dates, ranks and rolling bounds of the word in the year, the
+    same as year_bounds
+    """
+    source = source_key(tarfile_name, store_dir)
+    return memo(('bounds', word, year, source, cutoff, k, months),
+                lambda: year_bounds(word_series(word, year, tarfile_name,
+                                                cutoff, store_dir),
+                                    year, k, months))
+
+
+def word_events(word, year, tarfile_name, cutoff=100001, store_dir=None,
+                k=1.5, months=6):
+    """ Get the shock events of the word in the year against the lower bound
+    of its baseline
+    """
+    source = source_key(tarfile_name, store_dir)
+
+    def events():
+        _, rank, bounds = word_bounds(word, year, tarfile_name, cutoff,
+                                      store_dir, k, months)
+        return find_events(rank, bounds.lower)
+    return memo(('events', word, year, source, cutoff, k, months), events)